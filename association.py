@@ -0,0 +1,106 @@
+import numpy as np
+
+# define constants
+INFEASIBLE_COST = 1e9 # cost used for gated-out pairs inside a component
+
+# optimal assignment for a dense cost matrix (Hungarian / shortest augmenting path), as (rows, cols)
+def hungarian(cost):
+   transposed = cost.shape[0] > cost.shape[1]
+   if transposed:
+       cost = cost.T
+   n, m = cost.shape
+   
+   # 1-based potentials and column assignments, column 0 is a sentinel
+   u = np.zeros(n + 1)
+   v = np.zeros(m + 1)
+   p = np.zeros(m + 1, dtype=np.intp)
+   way = np.zeros(m + 1, dtype=np.intp)
+   for i in range(1, n + 1):
+       p[0] = i
+       j0 = 0
+       minv = np.full(m + 1, np.inf)
+       used = np.zeros(m + 1, dtype=bool)
+       while True:
+           used[j0] = True
+           i0 = p[j0]
+           free = ~used
+           free[0] = False
+           
+           # relax reduced costs of all free columns from row i0 at once
+           reduced = cost[i0 - 1] - u[i0] - v[1:]
+           better = free[1:] & (reduced < minv[1:])
+           minv[1:][better] = reduced[better]
+           way[1:][better] = j0
+           
+           j1 = np.flatnonzero(free)[np.argmin(minv[free])]
+           delta = minv[j1]
+           u[p[used]] += delta
+           v[used] -= delta
+           minv[free] -= delta
+           j0 = j1
+           if p[j0] == 0:
+               break
+               
+       # augment along the alternating path
+       while j0:
+           j1 = way[j0]
+           p[j0] = p[j1]
+           j0 = j1
+           
+   cols = np.flatnonzero(p[1:])
+   rows = p[1:][cols] - 1
+   if transposed:
+       rows, cols = cols, rows
+   order = np.argsort(rows)
+   return rows[order], cols[order]
+
+# connected components of a boolean bipartite gate matrix, as a list of (rows, cols)
+def gate_components(gate):
+   rows, cols = np.nonzero(gate)
+   n = gate.shape[0]
+   parent = list(range(n + gate.shape[1]))
+   
+   def find(a):
+       while parent[a] != a:
+           parent[a] = parent[parent[a]]
+           a = parent[a]
+       return a
+   
+   for r, c in zip(rows.tolist(), cols.tolist()):
+       ra, rb = find(r), find(n + c)
+       if ra != rb:
+           parent[ra] = rb
+           
+   components = {}
+   for r in np.unique(rows).tolist():
+       components.setdefault(find(r), ([], []))[0].append(r)
+   for c in np.unique(cols).tolist():
+       components.setdefault(find(n + c), ([], []))[1].append(c)
+   return [(np.array(r), np.array(c)) for r, c in components.values()]
+
+# globally optimal one-to-one association of detections to tracks within a distance gate
+# returns matched (detection, track) index pairs
+def associate(det_xy, track_xy, gate, track_mask=None):
+   det_xy = np.asarray(det_xy, dtype=float).reshape(-1, 2)
+   track_xy = np.asarray(track_xy, dtype=float).reshape(-1, 2)
+   if len(det_xy) == 0 or len(track_xy) == 0:
+       return []
+   
+   # full detection-to-track distance matrix, gated
+   dist = np.sqrt(((det_xy[:, None, :] - track_xy[None, :, :])**2).sum(axis=2))
+   feasible = dist < gate
+   if track_mask is not None:
+       feasible &= np.asarray(track_mask, dtype=bool)[None, :]
+       
+   # solve each independent cluster of the gate graph on its own
+   matches = []
+   for rows, cols in gate_components(feasible):
+       if len(rows) == 1 and len(cols) == 1:
+           matches.append((int(rows[0]), int(cols[0])))
+           continue
+       sub = np.where(feasible[np.ix_(rows, cols)], dist[np.ix_(rows, cols)], INFEASIBLE_COST)
+       for r, c in zip(*hungarian(sub)):
+           if sub[r, c] < INFEASIBLE_COST:
+               matches.append((int(rows[r]), int(cols[c])))
+   matches.sort()
+   return matches
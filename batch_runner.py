@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import time
+import multiprocessing
+import numpy as np
+from scenario import scripted_commands
+
+# define constants
+STEPS = 300 # simulation steps per episode
+
+# mean distance from each track's latest position to the nearest true moving object
+def track_error(env):
+   truth = np.vstack((env.moving_objects.positions(), (env.main_object.x, env.main_object.y)))
+   tracks = np.array([obj_data['positions'][-1] for obj_data in env.dynamic_objects.values()
+                      if obj_data['positions']], dtype=float).reshape(-1, 2)
+   if len(tracks) == 0:
+       return None
+   dist = np.sqrt(((tracks[:, None, :] - truth[None, :, :])**2).sum(axis=2))
+   return float(dist.min(axis=1).mean())
+
+# run one headless seeded episode and return its metrics
+def run_episode(task):
+   from env import Environment  # imported in the worker so the parent never initializes pygame
+   seed, steps = task
+   env = Environment(headless=True, seed=seed)
+   
+   step_ms = []
+   errors = []
+   track_counts = []
+   warnings = 0
+   for command in scripted_commands(seed, steps):
+       start = time.perf_counter()
+       env.step(command=command)
+       step_ms.append((time.perf_counter() - start) * 1000.0)
+       
+       warnings += env.current_warning is not None
+       track_counts.append(len(env.dynamic_objects))
+       error = track_error(env)
+       if error is not None:
+           errors.append(error)
+   
+   return {
+       'seed': seed,
+       'steps': steps,
+       'features': len(env.features),
+       'tracks': len(env.dynamic_objects),
+       'mean_tracks': float(np.mean(track_counts)),
+       'track_error': float(np.mean(errors)) if errors else None,
+       'warnings': warnings,
+       'mean_step_ms': float(np.mean(step_ms)),
+       'p95_step_ms': float(np.percentile(step_ms, 95)),
+   }
+
+# episodes already recorded in a results file, keyed by seed
+def load_results(path):
+   results = {}
+   if os.path.exists(path):
+       with open(path) as f:
+           for line in f:
+               if line.strip():
+                   record = json.loads(line)
+                   results[record['seed']] = record
+   return results
+
+# mean and standard deviation of every numeric metric across episodes
+def aggregate(records):
+   summary = {'episodes': len(records)}
+   for key in ('features', 'tracks', 'mean_tracks', 'track_error', 'warnings',
+               'mean_step_ms', 'p95_step_ms'):
+       values = [r[key] for r in records if r[key] is not None]
+       if values:
+           summary[key] = {'mean': float(np.mean(values)), 'std': float(np.std(values))}
+   return summary
+
+# run all missing seeds across a process pool, appending each episode as it finishes
+def run_batch(seeds, steps=STEPS, output="batch_results.jsonl", processes=None):
+   done = load_results(output)
+   tasks = [(seed, steps) for seed in seeds if seed not in done]
+   
+   # spawned workers start clean instead of inheriting the parent's library state through fork
+   with open(output, "a") as f, multiprocessing.get_context("spawn").Pool(processes) as pool:
+       for record in pool.imap_unordered(run_episode, tasks):
+           f.write(json.dumps(record) + "\n")
+           f.flush()
+           done[record['seed']] = record
+           print(f"seed {record['seed']}: {record['mean_step_ms']:.2f} ms/step, "
+                 f"{record['features']} features, {record['tracks']} tracks")
+       # let workers exit on their own rather than being terminated
+       pool.close()
+       pool.join()
+           
+   return aggregate([done[seed] for seed in seeds])
+
+def main():
+   parser = argparse.ArgumentParser(description="Monte Carlo batch runs of seeded headless episodes")
+   parser.add_argument("--episodes", type=int, default=16)
+   parser.add_argument("--first-seed", type=int, default=0)
+   parser.add_argument("--steps", type=int, default=STEPS)
+   parser.add_argument("--processes", type=int, default=None, help="defaults to the CPU count")
+   parser.add_argument("--output", default="batch_results.jsonl",
+                       help="episode results; seeds already in it are skipped")
+   args = parser.parse_args()
+   
+   seeds = range(args.first_seed, args.first_seed + args.episodes)
+   start = time.perf_counter()
+   summary = run_batch(seeds, args.steps, args.output, args.processes)
+   summary['wall_s'] = time.perf_counter() - start
+   print(json.dumps(summary, indent=2))
+   
+   with open(os.path.splitext(args.output)[0] + "_summary.json", "w") as f:
+       json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+   main()
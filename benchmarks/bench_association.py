@@ -0,0 +1,67 @@
+import argparse
+import time
+import numpy as np
+from association import associate
+
+# define constants
+TRACK_COUNTS = (10, 50, 100, 200, 500) # number of simultaneous tracks per scene
+GATE = 3 # association gate, as ASSOCIATION_THRESHOLD in env.py
+STEP_STD = 0.8 # per-frame displacement of each object
+CLUTTER = 0.2 # extra detections per track that belong to no track
+
+# the first-match matcher from update_features: each detection takes the first track in the gate
+def greedy_associate(det_xy, track_xy, gate):
+   matches = []
+   for i, (feat_x, feat_y) in enumerate(det_xy):
+       for j, (track_x, track_y) in enumerate(track_xy):
+           dist = np.sqrt((feat_x - track_x)**2 + (feat_y - track_y)**2)
+           if dist < gate:
+               matches.append((i, j))
+               break
+   return matches
+
+# a crowded scene: tracks packed so that gates overlap, detections shuffled and cluttered
+def make_scene(rng, num_tracks, width, height):
+   track_xy = rng.uniform((0, 0), (width, height), size=(num_tracks, 2))
+   det_xy = track_xy + rng.normal(0, STEP_STD, size=track_xy.shape)
+   clutter = rng.uniform((0, 0), (width, height), size=(int(num_tracks * CLUTTER), 2))
+   
+   truth = np.concatenate([np.arange(num_tracks), np.full(len(clutter), -1)])
+   order = rng.permutation(len(truth))
+   return np.concatenate([det_xy, clutter])[order], track_xy, truth[order]
+
+# fraction of detections whose assigned track is the true one (clutter should stay unassigned)
+def accuracy(matches, truth):
+   assigned = np.full(len(truth), -1)
+   for i, j in matches:
+       assigned[i] = j
+   return float(np.mean(assigned == truth))
+
+def time_call(fn, repeats):
+   fn()  # warm up
+   start = time.perf_counter()
+   for _ in range(repeats):
+       result = fn()
+   return (time.perf_counter() - start) / repeats * 1000.0, result
+
+def main():
+   parser = argparse.ArgumentParser(description="Compare greedy and global track association")
+   parser.add_argument("--tracks", type=int, nargs="+", default=TRACK_COUNTS)
+   parser.add_argument("--density", type=float, default=0.005, help="tracks per square pixel")
+   parser.add_argument("--repeats", type=int, default=5)
+   parser.add_argument("--seed", type=int, default=0)
+   args = parser.parse_args()
+   
+   rng = np.random.default_rng(args.seed)
+   print(f"{'tracks':>8} {'greedy ms':>10} {'global ms':>10} {'greedy acc':>11} {'global acc':>11}")
+   for num_tracks in args.tracks:
+       side = np.sqrt(num_tracks / args.density)
+       det_xy, track_xy, truth = make_scene(rng, num_tracks, side, side)
+       
+       greedy_ms, greedy = time_call(lambda: greedy_associate(det_xy, track_xy, GATE), args.repeats)
+       global_ms, matched = time_call(lambda: associate(det_xy, track_xy, GATE), args.repeats)
+       print(f"{num_tracks:>8} {greedy_ms:>10.2f} {global_ms:>10.2f} "
+             f"{accuracy(greedy, truth):>11.3f} {accuracy(matched, truth):>11.3f}")
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,84 @@
+import argparse
+import sys
+import time
+import numpy as np
+from sensor import Sensor, DISTANCE_THRESHOLD, MIN_CLUSTER_SIZE
+
+# define constants
+SCANS = 500 # random scans checked
+MAX_HITS = 400 # most hits in one random scan
+JUMP_PROBABILITY = 0.05 # chance that a hit starts a new surface
+
+# the loop-based clustering Sensor.extract_features replaced, kept as the reference
+def loop_extract_features(measurements, threshold=DISTANCE_THRESHOLD):
+   features = []
+   clusters = []
+   current_cluster = []
+   for i in range(len(measurements)):
+       if len(current_cluster) == 0:
+           current_cluster.append(measurements[i])
+       else:
+           prev_x, prev_y = measurements[i-1][2], measurements[i-1][3]
+           curr_x, curr_y = measurements[i][2], measurements[i][3]
+           if np.sqrt((curr_x - prev_x)**2 + (curr_y - prev_y)**2) < threshold:
+               current_cluster.append(measurements[i])
+           else:
+               if len(current_cluster) > MIN_CLUSTER_SIZE:
+                   clusters.append(current_cluster)
+               current_cluster = [measurements[i]]
+   if len(current_cluster) > MIN_CLUSTER_SIZE:
+       clusters.append(current_cluster)
+   for cluster in clusters:
+       features.append((np.mean([m[2] for m in cluster]), np.mean([m[3] for m in cluster])))
+   return features
+
+# a scan of (angle, dist, x, y) rows: hits walk along surfaces, jumping to a new surface now and then
+def random_scan(rng):
+   n = rng.integers(0, MAX_HITS)
+   steps = rng.normal(0, 1.5, size=(n, 2))
+   jumps = rng.random(n) < JUMP_PROBABILITY
+   steps[jumps] = rng.uniform(-100, 100, size=(np.count_nonzero(jumps), 2))
+   # start the scan part way along, so a surface often straddles the 0/2pi seam
+   xy = np.roll(rng.uniform(0, 1000, 2) + np.cumsum(steps, axis=0), rng.integers(0, max(n, 1)), axis=0)
+   return np.column_stack((np.linspace(0, 2*np.pi, n), np.zeros(n), xy))
+
+# the loop-based result the circular clustering should match: when the scan's last and first hits
+# are joined across the 0/2pi seam, the loop sees the scan rotated so the first cluster comes last
+def reference(scan, threshold=DISTANCE_THRESHOLD):
+   points = scan[:, 2:4]
+   gaps = np.flatnonzero(np.sqrt((np.diff(points, axis=0)**2).sum(axis=1)) >= threshold)
+   seam = len(gaps) and np.sqrt(((points[-1] - points[0])**2).sum()) < threshold
+   if seam:
+       scan = np.roll(scan, -(gaps[0] + 1), axis=0)
+   return loop_extract_features(scan, threshold), bool(seam)
+
+def main():
+   parser = argparse.ArgumentParser(description="Check vectorized scan clustering against the loop version")
+   parser.add_argument("--scans", type=int, default=SCANS)
+   parser.add_argument("--seed", type=int, default=0)
+   args = parser.parse_args()
+   
+   rng = np.random.default_rng(args.seed)
+   sensor = Sensor(use_cache=False)
+   scans = [random_scan(rng) for _ in range(args.scans)]
+   mismatches = seams = 0
+   loop_s = vector_s = 0.0
+   for scan in scans:
+       start = time.perf_counter()
+       expected, seam = reference(scan)
+       loop_s += time.perf_counter() - start
+       start = time.perf_counter()
+       features = sensor.extract_features(scan)
+       vector_s += time.perf_counter() - start
+   
+       seams += seam
+       if len(features) != len(expected) or not np.allclose(np.reshape(features, (-1, 2)),
+                                                             np.reshape(expected, (-1, 2))):
+           mismatches += 1
+   print(f"{args.scans} scans, {seams} joined across the seam, {mismatches} mismatches")
+   print(f"loop {loop_s / args.scans * 1000.0:.3f} ms/scan, vectorized {vector_s / args.scans * 1000.0:.3f} ms/scan")
+   if mismatches:
+       sys.exit(1)
+
+if __name__ == "__main__":
+   main()
\ No newline at end of file
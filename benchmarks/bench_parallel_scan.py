@@ -0,0 +1,50 @@
+import argparse
+import os
+import time
+import numpy as np
+from env import Environment
+
+# define constants
+NUM_RAYS = 4096 # rays per scan, dense enough for the casting to dominate
+SENSOR_RANGE = 500 # long rays, so each one marches many steps
+REPEATS = 20 # timed casts per configuration
+
+# mean wall time in ms of casting every ray of every robot once
+def time_cast(env, repeats):
+   rays = [np.arange(env.fleet.num_rays)] * len(env.fleet)
+   result = env.fleet.cast(env, rays)  # warm up
+   start = time.perf_counter()
+   for _ in range(repeats):
+       env.fleet.cast(env, rays)
+   return (time.perf_counter() - start) / repeats * 1000.0, result
+
+def main():
+   parser = argparse.ArgumentParser(description="Scaling of ray casting across worker processes")
+   parser.add_argument("--rays", type=int, default=NUM_RAYS)
+   parser.add_argument("--range", type=int, default=SENSOR_RANGE)
+   parser.add_argument("--robots", type=int, default=1)
+   parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+   parser.add_argument("--repeats", type=int, default=REPEATS)
+   parser.add_argument("--seed", type=int, default=0)
+   args = parser.parse_args()
+   
+   def make_env(workers):
+       return Environment(headless=True, seed=args.seed, sensor_range=args.range, num_rays=args.rays,
+                          num_robots=args.robots, scan_workers=workers)
+   
+   env = make_env(0)
+   base_ms, expected = time_cast(env, args.repeats)
+   env.close()
+   print(f"{'workers':>8} {'cast ms':>9} {'speedup':>8}")
+   print(f"{'in-proc':>8} {base_ms:>9.2f} {1.0:>8.2f}")
+   
+   for workers in range(1, args.max_workers + 1):
+       env = make_env(workers)
+       ms, result = time_cast(env, args.repeats)
+       env.close()
+       if not all(np.array_equal(a, b) for a, b in zip(result, expected)):
+           raise RuntimeError(f"{workers} workers cast different hits than the in-process caster")
+       print(f"{workers:>8} {ms:>9.2f} {base_ms / ms:>8.2f}")
+
+if __name__ == "__main__":
+   main()
\ No newline at end of file
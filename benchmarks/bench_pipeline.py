@@ -0,0 +1,129 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import pygame
+from env import Environment
+from renderer import Renderer
+from scenario import scripted_commands
+
+# define constants
+STEPS = 60 # timed frames per scenario
+WARMUP = 5 # untimed frames before timing
+TOLERANCE = 1.25 # allowed slowdown against the baseline before flagging a regression
+STAGES = ('scan', 'extract_features', 'update_features', 'check_proximity', 'draw')
+DEFAULTS = {'seed': 0, 'width': 1200, 'height': 600, 'num_rays': 720,
+            'sensor_range': 100, 'num_moving_objects': 3, 'num_robots': 1}
+
+# scaling sweeps, one parameter at a time around the defaults
+SWEEPS = {
+   'num_rays': [360, 720, 1440, 2880],
+   'sensor_range': [50, 100, 200, 300],
+   'num_moving_objects': [0, 3, 10, 30],
+   'map_size': [(600, 300), (1200, 600), (2400, 1200)],
+   'num_robots': [1, 2, 4, 8, 16],
+}
+
+def scenarios():
+   yield 'default', dict(DEFAULTS)
+   for name, values in SWEEPS.items():
+       for value in values:
+           params = dict(DEFAULTS)
+           if name == 'map_size':
+               params['width'], params['height'] = value
+               label = f"{value[0]}x{value[1]}"
+           else:
+               params[name] = value
+               label = str(value)
+           yield f"{name}={label}", params
+
+# replace a bound method with one that records its wall time in ms
+def timed(obj, name, samples):
+   method = getattr(obj, name)
+   def wrapper(*args, **kwargs):
+       start = time.perf_counter()
+       result = method(*args, **kwargs)
+       samples.append((time.perf_counter() - start) * 1000.0)
+       return result
+   setattr(obj, name, wrapper)
+
+# run one seeded scenario headless and return per-stage timing summaries
+def run_scenario(params, steps=STEPS):
+   env = Environment(params['width'], params['height'], headless=True, seed=params['seed'],
+                     num_moving_objects=params['num_moving_objects'],
+                     sensor_range=params['sensor_range'], num_rays=params['num_rays'],
+                     num_robots=params['num_robots'])
+   renderer = Renderer(env, pygame.Surface((env.width, env.height)))
+   
+   samples = {stage: [] for stage in STAGES}
+   frames = []
+   for i, command in enumerate(scripted_commands(params['seed'], steps + WARMUP)):
+       if i == WARMUP:
+           timed(env.fleet, 'scan', samples['scan'])
+           timed(env.fleet, 'extract_features', samples['extract_features'])
+           timed(env, 'update_features', samples['update_features'])
+           timed(env, 'check_proximity', samples['check_proximity'])
+           timed(renderer, 'draw', samples['draw'])
+       start = time.perf_counter()
+       measurements = env.step(command=command)
+       renderer.draw(measurements)
+       if i >= WARMUP:
+           frames.append((time.perf_counter() - start) * 1000.0)
+   
+   samples['frame'] = frames
+   result = {stage: summarize(values) for stage, values in samples.items()}
+   result['counts'] = {'measurements': len(measurements), 'features': len(env.features),
+                       'tracks': len(env.dynamic_objects)}
+   return result
+
+def summarize(values):
+   values = np.asarray(values)
+   return {'mean_ms': float(values.mean()), 'median_ms': float(np.median(values)),
+           'p95_ms': float(np.percentile(values, 95))}
+
+# stages whose median got slower than the baseline by more than the tolerance
+def regressions(results, baseline, tolerance=TOLERANCE):
+   found = []
+   for name, stages in results.items():
+       for stage, summary in stages.items():
+           old = baseline.get(name, {}).get(stage)
+           if stage == 'counts' or old is None or old['median_ms'] <= 0:
+               continue
+           ratio = summary['median_ms'] / old['median_ms']
+           if ratio > tolerance:
+               found.append((name, stage, ratio))
+   return found
+
+def main():
+   parser = argparse.ArgumentParser(description="Per-stage benchmarks of the simulation pipeline")
+   parser.add_argument("--output", default="bench_results.json")
+   parser.add_argument("--baseline", help="JSON results to compare against")
+   parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+   parser.add_argument("--steps", type=int, default=STEPS)
+   parser.add_argument("--only", help="run only scenarios whose name contains this text")
+   args = parser.parse_args()
+   
+   results = {}
+   for name, params in scenarios():
+       if args.only and args.only not in name:
+           continue
+       results[name] = run_scenario(params, args.steps)
+       medians = " ".join(f"{stage}={results[name][stage]['median_ms']:.2f}"
+                          for stage in STAGES + ('frame',))
+       print(f"{name:<28} {medians}")
+       
+   with open(args.output, "w") as f:
+       json.dump(results, f, indent=2)
+       
+   if args.baseline:
+       with open(args.baseline) as f:
+           baseline = json.load(f)
+       found = regressions(results, baseline, args.tolerance)
+       for name, stage, ratio in found:
+           print(f"REGRESSION {name} {stage}: {ratio:.2f}x baseline median")
+       if found:
+           sys.exit(1)
+
+if __name__ == "__main__":
+   main()
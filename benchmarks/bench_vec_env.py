@@ -0,0 +1,40 @@
+import argparse
+import time
+from env import Environment
+from vec_env import VecEnv, VEC_NUM_RAYS
+
+# define constants
+WORLD_COUNTS = (1, 16, 64, 256, 1024) # worlds stepped together
+STEPS = 20 # timed steps per configuration
+
+# world-steps per second of one Environment stepped on its own, for reference
+def environment_rate(num_rays, steps, seed):
+   env = Environment(headless=True, seed=seed, num_rays=num_rays)
+   env.step(command=(5, 0))
+   start = time.perf_counter()
+   env.step(steps, command=(5, 0))
+   rate = steps / (time.perf_counter() - start)
+   env.close()
+   return rate
+
+def main():
+   parser = argparse.ArgumentParser(description="Throughput of the vectorized environment")
+   parser.add_argument("--worlds", type=int, nargs="+", default=WORLD_COUNTS)
+   parser.add_argument("--rays", type=int, default=VEC_NUM_RAYS)
+   parser.add_argument("--steps", type=int, default=STEPS)
+   parser.add_argument("--seed", type=int, default=0)
+   args = parser.parse_args()
+   
+   print(f"{'worlds':>8} {'step ms':>9} {'world-steps/s':>14}")
+   print(f"{'env':>8} {'':>9} {environment_rate(args.rays, args.steps, args.seed):>14.0f}")
+   for num_worlds in args.worlds:
+       vec = VecEnv(num_worlds, seed=args.seed, num_rays=args.rays)
+       vec.step(vec.follow_actions())  # warm up
+       start = time.perf_counter()
+       for _ in range(args.steps):
+           vec.step(vec.follow_actions())
+       elapsed = time.perf_counter() - start
+       print(f"{num_worlds:>8} {elapsed / args.steps * 1000.0:>9.2f} {num_worlds * args.steps / elapsed:>14.0f}")
+
+if __name__ == "__main__":
+   main()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import numpy as np
+from tiled_map import TiledMap
+
+# define constants
+MARKER_RADIUS = 5 # radius of drawn measurement/feature markers
+
+# check whether any cell within a (2*radius+1)^2 box around each cell is set, using a summed-area table
+def box_any(mask, radius):
+   width, height = mask.shape
+   table = np.zeros((width + 1, height + 1), dtype=np.int32)
+   table[1:, 1:] = mask.astype(np.int32).cumsum(axis=0).cumsum(axis=1)
+   
+   x0 = np.clip(np.arange(width) - radius, 0, width)
+   x1 = np.clip(np.arange(width) + radius + 1, 0, width)
+   y0 = np.clip(np.arange(height) - radius, 0, height)
+   y1 = np.clip(np.arange(height) + radius + 1, 0, height)
+   counts = (table[x1][:, y1] - table[x0][:, y1] -
+             table[x1][:, y0] + table[x0][:, y0])
+   return counts > 0
+
+# Class to define precomputed collision fields
+class CollisionField:
+   def __init__(self, wall_mask, buffer, marker_radius=MARKER_RADIUS):
+       self.width, self.height = wall_mask.shape
+       self.buffer = buffer
+       self.marker_radius = marker_radius
+       
+       # walls inflated by the buffer zone, with the map border blocked as well
+       tiled = isinstance(wall_mask, TiledMap)
+       if tiled:
+           # too large to inflate up front: inflate tile by tile as they are touched
+           self.inflated = InflatedTiles(wall_mask, buffer)
+       else:
+           self.inflated = box_any(wall_mask, buffer)
+           self.inflated[:buffer, :] = True
+           self.inflated[self.width - buffer:, :] = True
+           self.inflated[:, :buffer] = True
+           self.inflated[:, self.height - buffer:] = True
+       
+       # measurement/feature marker centres, one (xs, ys) point set per layer; in-memory maps also
+       # count them per pixel so a check is one small window lookup, tiled maps keep only the points
+       self.overlay = None if tiled else np.zeros((self.width, self.height), dtype=np.int32)
+       self.layers = {}
+       
+   # check the inflated walls at a point
+   def blocked(self, x, y):
+       x, y = int(x), int(y)
+       if x < 0 or x >= self.width or y < 0 or y >= self.height:
+           return True
+       return bool(self.inflated[x, y])
+   
+   # check the inflated walls at many points at once
+   def blocked_many(self, xs, ys):
+       xs = np.asarray(xs, dtype=float).astype(np.intp)
+       ys = np.asarray(ys, dtype=float).astype(np.intp)
+       inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+       blocked = ~inside
+       blocked[inside] = self.inflated[xs[inside], ys[inside]]
+       return blocked
+   
+   # replace the marker points of one overlay layer, touching only the old and new points of the count grid
+   def set_layer(self, name, xs, ys):
+       xs = np.asarray(xs, dtype=float).astype(np.intp)
+       ys = np.asarray(ys, dtype=float).astype(np.intp)
+       inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+       points = (xs[inside], ys[inside])
+       
+       if self.overlay is not None:
+           if name in self.layers:
+               np.subtract.at(self.overlay, self.layers[name], 1)
+           np.add.at(self.overlay, points, 1)
+       self.layers[name] = points
+       
+   # check for any overlay marker within the buffer zone of a point
+   def overlay_hit(self, x, y):
+       x, y = int(x), int(y)
+       reach = self.buffer + self.marker_radius
+       if self.overlay is not None:
+           window = self.overlay[max(x - reach, 0):max(x + reach + 1, 0),
+                                 max(y - reach, 0):max(y + reach + 1, 0)]
+           return bool(window.any())
+       
+       # tiled maps: a map-sized grid would not fit, so test the sparse points
+       for xs, ys in self.layers.values():
+           if ((np.abs(xs - x) <= reach) & (np.abs(ys - y) <= reach)).any():
+               return True
+       return False
+
+# Class to define a tiled map inflated by a buffer zone, computed lazily per tile from a wall TiledMap
+# inflated tiles are kept as packed bits (8 KB for a 256 pixel tile) and never evicted: moving objects
+# anywhere on the map look their tiles up every step, so an LRU cache would thrash once they spread
+# over more tiles than it holds, re-inflating tiles from the walls on every step
+class InflatedTiles(TiledMap):
+   def __init__(self, walls, buffer):
+       self.walls = walls
+       self.buffer = buffer
+       self.init_tiles(walls.shape, walls.tile_size, None)
+       
+   # packed bits of one inflated tile, padded to a full tile and indexed [x * tile_size + y]
+   def packed(self, tx, ty):
+       key = (tx, ty)
+       bits = self.tiles.get(key)
+       if bits is None:
+           t = self.tile_size
+           inflated = self.load_tile(tx, ty)
+           tile = np.zeros((t, t), dtype=bool)
+           tile[:inflated.shape[0], :inflated.shape[1]] = inflated
+           bits = self.tiles[key] = np.packbits(tile)
+           self.loads += 1
+       return bits
+   
+   def tile(self, tx, ty):
+       return np.unpackbits(self.packed(tx, ty)).reshape(self.tile_size, self.tile_size).astype(bool)
+   
+   # cells at many points, read straight from the packed bits
+   def lookup(self, xs, ys):
+       xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp))
+       t = self.tile_size
+       tiles_down = -(-self.height // t)
+       keys = (xs // t) * tiles_down + ys // t
+       out = np.zeros(xs.shape, dtype=bool)
+       for key in np.unique(keys):
+           sel = keys == key
+           bits = self.packed(*divmod(int(key), tiles_down))
+           cell = (xs[sel] % t) * t + ys[sel] % t
+           out[sel] = (bits[cell >> 3] >> (7 - (cell & 7))) & 1
+       return out
+       
+   # inflate one tile from the walls around it, with the map border blocked as well
+   def load_tile(self, tx, ty):
+       t, b = self.tile_size, self.buffer
+       x0, y0 = tx*t, ty*t
+       x1, y1 = min(x0 + t, self.width), min(y0 + t, self.height)
+       hx0, hy0 = max(x0 - b, 0), max(y0 - b, 0)
+       hx1, hy1 = min(x1 + b, self.width), min(y1 + b, self.height)
+       tile = box_any(self.walls.window(hx0, hy0, hx1, hy1), b)[x0 - hx0:x1 - hx0, y0 - hy0:y1 - hy0]
+       
+       gx = np.arange(x0, x1)[:, None]
+       gy = np.arange(y0, y1)[None, :]
+       tile |= (gx < b) | (gx >= self.width - b) | (gy < b) | (gy >= self.height - b)
+       return tile
\ No newline at end of file
@@ -1,9 +1,22 @@
 import pygame
 import numpy as np
-from features import Feature
+from features import FeatureMap
 from movingObjects import MovingObject
-from robot import Robot
-from tts_system import TTSSystem
+from swarm import Swarm
+from fleet import Fleet
+from sensor import NUM_RAYS
+from tts_system import TTSSystem, NullBackend
+from collision import CollisionField
+from tiled_map import TiledMap
+from association import associate
+from occupancy_grid import OccupancyGrid
+from proximity import nearest_obstacles, WARNING_DISTANCE
+from telemetry import Telemetry
+from sim_clock import SimClock
+from map_snapshot import load_snapshot
+from parallel_scan import ParallelCaster
+from renderer import Renderer, BLACK
+from scene import occupancy_window, MAIN_OBJECT_SIZE, MOVING_OBJECT_RADIUS
 
 # TODO:
 # - add graphical representation of the environment
@@ -19,45 +32,67 @@ MAX_RANGE = 100 # maximum range of sensor
 OBJ_ZONE = MAX_RANGE/2 # zone of main object
 MIN_CLUSTER_SIZE = 3 # minimum cluster size for new dynamic objects
 
-# define colors
-BLACK = (0, 0, 0, 255) # walls 
-WHITE = (255, 255, 255, 255) # background
-RED = (255, 0, 0, 255) # robot
-GREEN = (0, 255, 0, 255) # moving objects
-BLUE = (0, 0, 255, 255) # features
-GREY = (128, 128, 128, 255) # path and object zone
-YELLOW = (255, 255, 0, 255) # dynamic objects
-
 # Class to define the environment
 class Environment:
-   def __init__(self, width=1200, height=600):
-       pygame.init()
+   def __init__(self, width=1200, height=600, headless=False, seed=None,
+                num_moving_objects=NUM_MOVING_OBJECTS, sensor_range=MAX_RANGE, num_rays=NUM_RAYS,
+                clock=None, map_path=None, num_robots=1, map_snapshot=None, scan_workers=0):
+       if map_path is not None and not headless:
+           raise ValueError("tiled maps are only supported in headless mode")
+       if not headless:
+           pygame.init()
        self.width = width
        self.height = height
-       self.screen = pygame.display.set_mode((width, height))
-       pygame.display.set_caption("SLAM with DATMO")
-       
-       # Load and process floor plan       
-       self.floor_plan = pygame.image.load("floor_plan.png")
-       self.floor_plan = pygame.transform.scale(self.floor_plan, (width, height))
-       self.screen.blit(self.floor_plan, (0, 0))
-       
-       # Create a hidden screen (off-screen surface) for use in collision detection
-       self.hidden_screen = pygame.Surface((width, height))
-       # Copy the content from the visible screen to the hidden screen
-       self.hidden_screen.blit(self.screen, (0, 0))
-
-       pygame.display.flip()
-        
-       
-       # Initialize robot and objects
-       self.robot = Robot(width//4 + 5, height//4 + 5)
-       self.main_object = MovingObject(width//4 + 50, height//4 + 50)
-       self.moving_objects = [MovingObject(np.random.randint(0, width),
-                                         np.random.randint(0, height)) 
-                            for _ in range(NUM_MOVING_OBJECTS)] # add NUM_MOVING_OBJECTS moving objects
-       
-       self.features = {}
+       self.headless = headless
+       # one seeded generator drives every random choice, so seeded runs are repeatable
+       self.rng = np.random.default_rng(seed)
+       # simulated time for track bookkeeping: a fixed-step SimClock, advanced once per update();
+       # any callable returning milliseconds also works, and is then only read
+       self.clock = SimClock() if clock is None else clock
+       
+       # Load and process floor plan, or open a tiled map whose tiles are read as the robot reaches them
+       if map_path is None:
+           self.floor_plan = pygame.image.load("floor_plan.png")
+           self.floor_plan = pygame.transform.scale(self.floor_plan, (width, height))
+       else:
+           self.floor_plan = None
+           self.wall_mask = TiledMap(map_path)
+           self.width, self.height = width, height = self.wall_mask.shape
+       
+       # Rendering is an optional observer of the world state
+       self.screen = None
+       self.renderer = None
+       if not headless:
+           self.screen = pygame.display.set_mode((width, height))
+           pygame.display.set_caption("SLAM with DATMO")
+           self.screen.blit(self.floor_plan, (0, 0))
+           pygame.display.flip()
+           self.renderer = Renderer(self, self.screen)
+       
+       # scene versions for the scan cache: static walls, and anything that moves
+       self.static_version = 0
+       self.dynamic_version = 0
+       self.last_occluders = None
+       
+       # per-stage frame timings and counters, off unless enabled
+       self.telemetry = Telemetry()
+       
+       # Precompute collision field from the static walls of the floor plan
+       if self.floor_plan is not None:
+           self.wall_mask = np.all(pygame.surfarray.array3d(self.floor_plan) == BLACK[:3], axis=-1)
+       self.collision_buffer = COLLISION_BUFFER  # Buffer zone for collision avoidance
+       self.collision_field = CollisionField(self.wall_mask, self.collision_buffer)
+       
+       # Initialize robots and objects; self.robot is the lead robot that follows the main object
+       self.fleet = Fleet.create(num_robots, width//4 + 5, height//4 + 5, self, self.rng, sensor_range, num_rays)
+       self.robots = self.fleet.robots
+       self.robot = self.robots[0]
+       self.main_object = MovingObject(width//4 + 50, height//4 + 50, rng=self.rng)
+       self.moving_objects = Swarm(num_moving_objects, width, height, self.rng) # add num_moving_objects moving objects
+       
+       self.features = FeatureMap(ASSOCIATION_THRESHOLD)
+       # a dense grid does not scale to tiled maps
+       self.occupancy = OccupancyGrid(width, height) if map_path is None else None
        self.feature_id_counter = 0
        self.dynamic_objects = {}  # {id: {'positions': [], 'velocity': 0, 'last_update': time}}
        # initialize first dynamic object
@@ -67,37 +102,32 @@ class Environment:
                        'last_update': 0
                    }
        self.dynamic_object_counter = 1
-       self.collision_buffer = COLLISION_BUFFER  # Buffer zone for collision avoidance
+       
+       # what each robot's detections did to the shared map and track set
+       self.contributions = {key: np.zeros(num_robots, dtype=np.int64)
+                             for key in ('detections', 'track_updates', 'new_tracks',
+                                         'feature_updates', 'new_features')}
        
        # Add these lines for warning messages
-       self.font = pygame.font.Font(None, 36)
        self.last_warning_time = 0
        self.current_warning = None
        
-       # Add TTS system initialization
-       self.tts = TTSSystem()
+       # speech worker for warnings, started with the engine on the first warning; headless runs start neither
+       self.tts = TTSSystem(NullBackend() if headless else None, echo=not headless)
+       
+       # cast rays on a pool of worker processes sharing the static walls, when asked for
+       if scan_workers:
+           self.fleet.caster = ParallelCaster(self, scan_workers)
+       
+       # warm start from a saved feature map, track table and occupancy grid
+       if map_snapshot is not None:
+           load_snapshot(self, map_snapshot)
        
    
    # check for collision for moving objects
    def is_collision_object(self, x, y):
-       x, y = int(x), int(y)
-       
-       # Check bounds with buffer
-       if (x < self.collision_buffer or x >= self.width - self.collision_buffer or 
-           y < self.collision_buffer or y >= self.height - self.collision_buffer):
-           return True
-       
-       # Check immediate surroundings (buffer zone)
-       for dx in range(-self.collision_buffer, self.collision_buffer + 1):
-           for dy in range(-self.collision_buffer, self.collision_buffer + 1):
-               check_x = x + dx
-               check_y = y + dy
-               
-               if (0 <= check_x < self.width and 0 <= check_y < self.height):
-                   if (self.hidden_screen.get_at((check_x, check_y)) == BLACK):
-                       return True
-       
-       return False
+       # walls inflated by the buffer zone, looked up in one step
+       return self.collision_field.blocked(x, y)
     
    # check for collision for sensor
    def is_collision_sensor(self, x, y):
@@ -108,8 +138,22 @@ class Environment:
            return True
        
        # collision with walls/objects
-       return self.screen.get_at((x, y)) == BLACK or self.screen.get_at((x, y)) == GREEN
-   
+       grid, x0, y0 = self.sensor_window(x, y, 0)
+       return bool(grid[x - x0, y - y0])
+
+   # occupancy seen by the sensor around a point, as a boolean array indexed [x - x0, y - y0]
+   def sensor_window(self, x, y, radius):
+       return occupancy_window(self.wall_mask, x, y, radius, self.moving_objects.x, self.moving_objects.y,
+                               self.main_object.x, self.main_object.y)
+
+   # objects the sensor can see that may move, as rows of (x, y, radius) at stamped pixel positions
+   def occluders(self):
+       swarm = self.moving_objects
+       rows = np.column_stack((swarm.x.astype(np.intp), swarm.y.astype(np.intp),
+                               np.full(len(swarm), MOVING_OBJECT_RADIUS))).astype(float)
+       main = (int(self.main_object.x), int(self.main_object.y), MAIN_OBJECT_SIZE * np.sqrt(2))
+       return np.vstack((rows, main))
+
    # check for collision for robot
    def is_collision_robot(self, x, y):
        x, y = int(x), int(y)
@@ -119,100 +163,133 @@ class Environment:
            y < self.collision_buffer or y >= self.height - self.collision_buffer):
            return True
        
-       # Check immediate surroundings (buffer zone)
-       for dx in range(-self.collision_buffer, self.collision_buffer + 1):
-           for dy in range(-self.collision_buffer, self.collision_buffer + 1):
-               check_x = x + dx
-               check_y = y + dy
-               
-               if (0 <= check_x < self.width and 0 <= check_y < self.height):
-                   if (self.screen.get_at((check_x, check_y)) == BLUE or 
-                       self.screen.get_at((check_x, check_y)) == YELLOW):
-                       return True
+       # Check measurements and features in the buffer zone
+       if self.collision_field.overlay_hit(x, y):
+           return True
        
        # Check for dynamic objects
-       for obj in self.moving_objects:
-           dist = np.sqrt((x - obj.x)**2 + (y - obj.y)**2)
-           if dist < self.collision_buffer * 2:  # Larger buffer for moving objects
-               return True
-       
-       return False
+       dist = np.sqrt((x - self.moving_objects.x)**2 + (y - self.moving_objects.y)**2)
+       return bool(np.any(dist < self.collision_buffer * 2))  # Larger buffer for moving objects
    
-   def update(self):
+   # main object command from the WASD keys
+   def read_keys(self):
        keys = pygame.key.get_pressed()
        dx = dy = 0
        if keys[pygame.K_w]: dy = -VELOCITY_MAIN_OBJECT
        if keys[pygame.K_s]: dy = VELOCITY_MAIN_OBJECT
        if keys[pygame.K_a]: dx = -VELOCITY_MAIN_OBJECT
        if keys[pygame.K_d]: dx = VELOCITY_MAIN_OBJECT
-       
-       new_x = self.main_object.x + dx
-       new_y = self.main_object.y + dy
-       
-       if not self.is_collision_object(new_x, new_y):
-           self.main_object.x = new_x
-           self.main_object.y = new_y
+       return dx, dy
+   
+   # advance the clock and the world n fixed steps with the same command, returning the last scan
+   def step(self, n=1, command=None):
+       measurements = None
+       for _ in range(n):
+           measurements = self.update(command)
+       return measurements
+   
+   # step until the simulated time reaches t_ms
+   def run_until(self, t_ms, command=None):
+       return self.step(self.clock.steps_until(t_ms), command)
+   
+   # stop the speech worker and any scan worker processes
+   def close(self):
+       self.tts.close()
+       if self.fleet.caster is not None:
+           self.fleet.caster.close()
+           self.fleet.caster = None
+   
+   # advance the world one step; command is the main object's (dx, dy), read from the keyboard if omitted
+   # a SimClock is stepped first, any other time source is only read
+   def update(self, command=None):
+       if isinstance(self.clock, SimClock):
+           self.clock.step()
+       if command is None:
+           command = (0, 0) if self.headless else self.read_keys()
+       dx, dy = command
+       telemetry = self.telemetry
+       telemetry.begin_frame()
+       
+       with telemetry.stage('move_objects'):
+           new_x = self.main_object.x + dx
+           new_y = self.main_object.y + dy
            
-       # Update moving objects
-       for obj in self.moving_objects:
-           obj.update(self)
+           if not self.is_collision_object(new_x, new_y):
+               self.main_object.x = new_x
+               self.main_object.y = new_y
+               
+           # Update moving objects
+           self.moving_objects.step(self.collision_field)
            
-       # Update robot
-       self.robot.move(self.main_object.x, self.main_object.y, self)
-       
-       # Process sensor measurements
-       measurements = self.robot.sensor.scan(self.robot.x, self.robot.y, self)
+           # bump the dynamic scene version when anything visible moved
+           occluders = self.occluders()
+           if self.last_occluders is None or not np.array_equal(occluders, self.last_occluders):
+               self.dynamic_version += 1
+           self.last_occluders = occluders
+           
+       # Update robots
+       with telemetry.stage('move_robot'):
+           self.fleet.move(self.main_object.x, self.main_object.y, self)
+       
+       # Process sensor measurements, all robots in one batched pass
+       with telemetry.stage('scan'):
+           measurements = self.fleet.scan(self)
+       # integrate free space and hits into the occupancy grid
+       if self.occupancy is not None:
+           with telemetry.stage('occupancy_grid'):
+               for robot in self.robots:
+                   self.occupancy.update(robot.x, robot.y, robot.sensor)
        # extract features from measurements
-       features = self.robot.sensor.extract_features(measurements)
+       with telemetry.stage('extract_features'):
+           features, sources = self.fleet.extract_features(measurements)
        
-       # Update feature map
-       self.update_features(features, measurements)
+       # Update the shared feature map and track set
+       with telemetry.stage('update_features'):
+           self.update_features(features, measurements, sources)
        
        # check proximity of measurements to robot
-       self.check_proximity(measurements)
+       with telemetry.stage('check_proximity'):
+           self.check_proximity(measurements)
+       
+       # refresh the measurement and feature layers used for robot collision
+       with telemetry.stage('collision_layers'):
+           self.collision_field.set_layer('measurements', measurements[:, 2], measurements[:, 3])
+           self.collision_field.set_layer('features', *self.features.positions()[1:])
+       
+       telemetry.count('rays', sum(robot.sensor.rays_cast for robot in self.robots))
+       telemetry.count('hits', len(measurements))
+       telemetry.count('clusters', len(features))
+       telemetry.count('features', len(self.features))
+       telemetry.count('tracks', len(self.dynamic_objects))
+       telemetry.end_frame()
        
        return measurements
    
    def check_proximity(self, measurements):
-       min_distance = float('inf')
-       min_angle = 0
-       
-       for measurement in measurements:
-           # Calculate distance between measurement and main object
-           dx = measurement[2] - self.main_object.x
-           dy = measurement[3] - self.main_object.y
-           distance = np.sqrt(dx**2 + dy**2)
-           
-           if distance < 5:
-               continue
-               
-           if distance < min_distance:
-               min_distance = distance
-               min_angle = np.arctan2(dy, dx)
-       
-       for feature in self.features.values():
-           dx = feature.x - self.main_object.x
-           dy = feature.y - self.main_object.y
-           distance = np.sqrt(dx**2 + dy**2)
-           
-           if distance < 5:
-               continue
-           
-           if distance < min_distance:
-               min_distance = distance
-               min_angle = np.arctan2(dy, dx)
-               
-       if min_distance < 30:
+       hit_xy = np.asarray(measurements, dtype=float).reshape(-1, 4)[:, 2:4]
+       distance, bearing, _, _ = self.nearest_obstacles([(self.main_object.x, self.main_object.y)], hit_xy)
+       min_distance, min_angle = distance[0], bearing[0]
+       
+       if min_distance < WARNING_DISTANCE:
            angle_degrees = np.degrees(min_angle) % 360
            self.current_warning = f"Warning: Obstacle at {min_distance:.1f} pixels, {angle_degrees:.1f}°"
-           print(self.current_warning)  # Still print to console
-           self.tts.speak(self.current_warning)  # Add TTS output
+           # spoken (and echoed to the console) by the speech worker, closest obstacle first
+           self.tts.speak(self.current_warning, min_distance)
        else:
            self.current_warning = None
    
-   # Update feature map
-   def update_features(self, observed_features, measurements):
-       current_time = pygame.time.get_ticks()
+   # nearest scan hit or mapped feature to each of a batch of points, as (distance, bearing, kind, source)
+   # e.g. points = robot, main object and the latest position of every dynamic track
+   def nearest_obstacles(self, points, hit_xy, radius=WARNING_DISTANCE):
+       return nearest_obstacles(points, hit_xy, self.features, radius)
+   
+   # Update feature map; sources gives the index of the robot behind each detection (all the lead robot if omitted)
+   def update_features(self, observed_features, measurements, sources=None):
+       current_time = self.clock()
+       if sources is None:
+           sources = np.zeros(len(observed_features), dtype=np.intp)
+       contributions = self.contributions
+       np.add.at(contributions['detections'], sources, 1)
        
        # Track dynamic objects
        dynamic_candidates = []
@@ -220,35 +297,37 @@ class Environment:
        features_to_remove = set()  # Track features that need to be removed
        
        # First, update existing dynamic objects
-       for feat_x, feat_y in observed_features:
-           is_dynamic = False
-           
-           # Check if feature corresponds to known dynamic object
-           for obj_id, obj_data in self.dynamic_objects.items():
-               if len(obj_data['positions']) == 0:
-                   continue
-                    
-               prev_pos = obj_data['positions'][-1]
-               dist = np.sqrt((feat_x - prev_pos[0])**2 + (feat_y - prev_pos[1])**2)
+       # Only tracks that have moved significantly can take detections
+       track_ids = [obj_id for obj_id, obj_data in self.dynamic_objects.items()
+                    if len(obj_data['positions']) > 0]
+       track_xy = [self.dynamic_objects[obj_id]['positions'][-1] for obj_id in track_ids]
+       movable = [self.dynamic_objects[obj_id]['velocity'] > 0.5 for obj_id in track_ids]  # Added velocity threshold
+       
+       # Assign detections to tracks globally over the gated distance matrix
+       matches = dict(associate(observed_features, track_xy, ASSOCIATION_THRESHOLD, movable))
+       self.telemetry.count('association_comparisons', len(observed_features) * len(track_xy))
+       
+       for i, (feat_x, feat_y) in enumerate(observed_features):
+           if i not in matches:
+               dynamic_candidates.append((feat_x, feat_y, sources[i]))
+               continue
                
-               # Only consider it dynamic if it has moved significantly
-               if dist < ASSOCIATION_THRESHOLD and obj_data['velocity'] > 0.5:  # Added velocity threshold
-                   dt = (current_time - obj_data['last_update']) / 1000.0
-                   if dt > 0:
-                       velocity = dist / dt
-                       obj_data['velocity'] = 0.7 * obj_data['velocity'] + 0.3 * velocity
-                   
-                   obj_data['positions'].append((feat_x, feat_y))
-                   obj_data['last_update'] = current_time
-                   is_dynamic = True
-                   matched_dynamics.add(obj_id)
-                   
-                   if len(obj_data['positions']) > MAX_HISTORY:
-                       obj_data['positions'].pop(0)
-                   break
+           obj_id = track_ids[matches[i]]
+           obj_data = self.dynamic_objects[obj_id]
+           prev_pos = obj_data['positions'][-1]
+           dist = np.sqrt((feat_x - prev_pos[0])**2 + (feat_y - prev_pos[1])**2)
+           dt = (current_time - obj_data['last_update']) / 1000.0
+           if dt > 0:
+               velocity = dist / dt
+               obj_data['velocity'] = 0.7 * obj_data['velocity'] + 0.3 * velocity
            
-           if not is_dynamic:
-               dynamic_candidates.append((feat_x, feat_y))
+           obj_data['positions'].append((feat_x, feat_y))
+           obj_data['last_update'] = current_time
+           matched_dynamics.add(obj_id)
+           contributions['track_updates'][sources[i]] += 1
+           
+           if len(obj_data['positions']) > MAX_HISTORY:
+               obj_data['positions'].pop(0)
        
        # Only remove dynamic objects that have shown consistent movement
        current_objects = list(self.dynamic_objects.keys())
@@ -259,7 +338,9 @@ class Environment:
                    # Only remove features if the object has shown significant movement
                    if self.dynamic_objects[obj_id]['velocity'] > 0.5:
                        last_pos = self.dynamic_objects[obj_id]['positions'][-1]
-                       for feat_id, feature in self.features.items():
+                       for feat_id in self.features.index.query(last_pos[0], last_pos[1],
+                                                               ASSOCIATION_THRESHOLD):
+                           feature = self.features[feat_id]
                            feat_dist = np.sqrt((last_pos[0] - feature.x)**2 + 
                                              (last_pos[1] - feature.y)**2)
                            if feat_dist < ASSOCIATION_THRESHOLD:
@@ -267,132 +348,71 @@ class Environment:
                    del self.dynamic_objects[obj_id]
        
        # Process remaining candidates with more strict criteria for new dynamic objects
-       for feat_x, feat_y in dynamic_candidates:
-           # Check if this could be a new dynamic object by looking at recent feature history
-           is_new_dynamic = False
-           for feature in self.features.values():
-               dist = np.sqrt((feat_x - feature.x)**2 + (feat_y - feature.y)**2)
-               
-               # More strict criteria for new dynamic objects
-               if (dist > ASSOCIATION_THRESHOLD and 
-                   dist < ASSOCIATION_THRESHOLD * 2 and 
-                   len(self.features) > MIN_CLUSTER_SIZE):  # Ensure we have enough features
-                   
-                   # Check if the feature has moved consistently
-                   consistent_movement = True
-                   for other_feature in self.features.values():
-                       if np.sqrt((other_feature.x - feat_x)**2 + 
-                                (other_feature.y - feat_y)**2) < ASSOCIATION_THRESHOLD:
-                           consistent_movement = False
-                           break
-                   
-                   if consistent_movement:
-                       self.dynamic_objects[self.dynamic_object_counter] = {
-                           'positions': [(feat_x, feat_y)],
-                           'velocity': 0,
-                           'last_update': current_time
-                       }
-                       self.dynamic_object_counter += 1
-                       is_new_dynamic = True
-                       break
+       kalman_updates = []  # (feature id, observed x, observed y), applied together below
+       for feat_x, feat_y, source in dynamic_candidates:
+           # Only features within twice the threshold can affect the decision
+           nearby = []
+           for feat_id in self.features.index.query(feat_x, feat_y, ASSOCIATION_THRESHOLD * 2):
+               feature = self.features[feat_id]
+               nearby.append((feature, np.sqrt((feat_x - feature.x)**2 + (feat_y - feature.y)**2)))
+           
+           # More strict criteria for new dynamic objects: close to the map, but
+           # not on any feature (the feature has moved consistently)
+           is_new_dynamic = (len(self.features) > MIN_CLUSTER_SIZE and  # Ensure we have enough features
+                             any(ASSOCIATION_THRESHOLD < dist < ASSOCIATION_THRESHOLD * 2
+                                 for _, dist in nearby) and
+                             not any(dist < ASSOCIATION_THRESHOLD for _, dist in nearby))
+           if is_new_dynamic:
+               self.dynamic_objects[self.dynamic_object_counter] = {
+                   'positions': [(feat_x, feat_y)],
+                   'velocity': 0,
+                   'last_update': current_time
+               }
+               self.dynamic_object_counter += 1
+               contributions['new_tracks'][source] += 1
            
            # Uses kalman filter to update feature position
            if not is_new_dynamic:
                # Process as static feature
                associated = False
-               for feature in self.features.values():
-                   dist = np.sqrt((feat_x - feature.x)**2 + (feat_y - feature.y)**2)
+               for feature, dist in nearby:
                    if dist < ASSOCIATION_THRESHOLD:
                        associated = True
-                       # Kalman filter update
-                       innovation = np.array([feat_x - feature.x, feat_y - feature.y])
-                       K = feature.covariance @ np.linalg.inv(feature.covariance + np.eye(2) * 0.1)
-                       feature.x += K[0,0] * innovation[0]
-                       feature.y += K[1,1] * innovation[1]
-                       feature.covariance = (np.eye(2) - K) @ feature.covariance
+                       kalman_updates.append((feature.id, feat_x, feat_y))
+                       contributions['feature_updates'][source] += 1
                        break
                
                if not associated:
-                   new_feature = Feature(feat_x, feat_y, self.feature_id_counter)
-                   self.features[self.feature_id_counter] = new_feature
+                   self.features.add(self.feature_id_counter, feat_x, feat_y)
                    self.feature_id_counter += 1
+                   contributions['new_features'][source] += 1
+       
+       # Kalman filter update of all associated features in one step
+       if kalman_updates:
+           self.features.kalman_update(*zip(*kalman_updates))
         
         # Use measurements to remove dangling features
-       for feat_id, feature in self.features.items():
-           dangling_feature = True
-           dist_to_robot = np.sqrt((self.robot.x - feature.x)**2 + 
-                                 (self.robot.y - feature.y)**2)
-           if dist_to_robot >= MAX_RANGE:
-               dangling_feature = False
-           if dist_to_robot < MAX_RANGE:
-               for measurement in measurements:
-                   dist = np.sqrt((measurement[2] - feature.x)**2 + 
-                                 (measurement[3] - feature.y)**2)
-                   if dist <= ASSOCIATION_THRESHOLD:  
-                       dangling_feature = False
-                       break
-                
-           if dangling_feature:
-               features_to_remove.add(feat_id)
+       hits = np.asarray(measurements, dtype=float).reshape(-1, 4)
+       meas_x, meas_y = hits[:, 2], hits[:, 3]
+       feat_ids, feat_x, feat_y = self.features.positions()
+       # features out of range of every robot cannot be checked
+       robot_x = np.array([robot.x for robot in self.robots])[:, None]
+       robot_y = np.array([robot.y for robot in self.robots])[:, None]
+       in_range = np.any(np.sqrt((robot_x - feat_x)**2 + (robot_y - feat_y)**2) <
+                         self.robot.sensor.max_range, axis=0)
+       feat_ids, feat_x, feat_y = feat_ids[in_range], feat_x[in_range], feat_y[in_range]
+       dist = np.sqrt((feat_x[:, None] - meas_x[None, :])**2 + 
+                      (feat_y[:, None] - meas_y[None, :])**2)
+       dangling = ~np.any(dist <= ASSOCIATION_THRESHOLD, axis=1)
+       features_to_remove.update(feat_ids[dangling].tolist())
                
        # Remove marked features
        for feat_id in features_to_remove:
            if feat_id in self.features:
                del self.features[feat_id]
-        
-        
-                       
            
    def draw(self, measurements):
-       self.screen.fill(WHITE)
-       
-       # Draw floor plan
-       self.screen.blit(self.floor_plan, (0, 0))
-       
-       # Draw measurements
-       for measurement in measurements:
-           pygame.draw.circle(self.screen, YELLOW, 
-                            (int(measurement[2]), int(measurement[3])), 5)
-       
-       # Draw features
-       for feature in self.features.values():
-           pygame.draw.circle(self.screen, BLUE, 
-                            (int(feature.x), int(feature.y)), 5)
-           
-       # Copy the content from the visible screen to the hidden screen
-       self.hidden_screen.blit(self.screen, (0, 0))
-       
-       # Draw moving objects
-       for obj in self.moving_objects:
-           pygame.draw.circle(self.screen, GREEN, 
-                            (int(obj.x), int(obj.y)), 10)
-               
-           
-       # Draw main object
-       pygame.draw.line(self.screen, GREEN, 
-                       (int(self.main_object.x-5), int(self.main_object.y-5)),
-                       (int(self.main_object.x+5), int(self.main_object.y+5)), 2)
-       pygame.draw.line(self.screen, GREEN, 
-                       (int(self.main_object.x-5), int(self.main_object.y+5)),
-                       (int(self.main_object.x+5), int(self.main_object.y-5)), 2)
-       pygame.draw.circle(self.screen, GREY, 
-                        (int(self.main_object.x), int(self.main_object.y)), int(OBJ_ZONE), 1)
-       
-       # Draw robot
-       pygame.draw.circle(self.screen, RED, 
-                        (int(self.robot.x), int(self.robot.y)), 10)
-       pygame.draw.circle(self.screen, GREY, 
-                        (int(self.robot.x), int(self.robot.y)), MAX_RANGE, 1)
-       
-       # Draw robot path
-       if len(self.robot.path) > 1:
-           pygame.draw.lines(self.screen, GREY, False,
-                           [(int(x), int(y)) for x, y in self.robot.path])
-       
-       if self.current_warning:
-           warning_text = self.font.render(self.current_warning, True, RED)
-           warning_rect = warning_text.get_rect()
-           warning_rect.topleft = (10, 10)  # Position in top-left corner
-           self.screen.blit(warning_text, warning_rect)
-        
-       pygame.display.flip()
\ No newline at end of file
+       if self.renderer:
+           with self.telemetry.stage('draw'):
+               self.renderer.draw(measurements)
+           self.telemetry.end_frame()
\ No newline at end of file
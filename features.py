@@ -1,12 +1,152 @@
 import numpy as np
+from spatial_index import SpatialHash
 
 # define constants
 NOISE_STD_COV = 0.1 # covariance of pose
+NOISE_MEAS_COV = 0.1 # covariance of feature observations
+INITIAL_CAPACITY = 256 # initial number of feature slots
 
-# Class to define features
+# Class to define a read-only view of one feature in a FeatureMap; positions change through the map,
+# which keeps its spatial index in step
 class Feature:
-   def __init__(self, x, y, feature_id):
-       self.x = x
-       self.y = y
+   def __init__(self, feature_map, feature_id):
+       self.map = feature_map
        self.id = feature_id
-       self.covariance = np.eye(2) * NOISE_STD_COV
\ No newline at end of file
+       
+   @property
+   def x(self):
+       return self.map.x[self.map.slots[self.id]]
+   
+   @property
+   def y(self):
+       return self.map.y[self.map.slots[self.id]]
+   
+   @property
+   def covariance(self):
+       return self.map.covariance[self.map.slots[self.id]]
+   
+# Class to define the feature map as contiguous arrays, with a dict-like interface keyed on feature id
+class FeatureMap:
+   def __init__(self, cell_size, capacity=INITIAL_CAPACITY):
+       self.ids = np.full(capacity, -1, dtype=np.int64)
+       self.x = np.zeros(capacity)
+       self.y = np.zeros(capacity)
+       self.covariance = np.zeros((capacity, 2, 2))
+       self.alive = np.zeros(capacity, dtype=bool)
+       self.size = 0  # number of slots in use, alive or not
+       self.slots = {}  # {id: slot}, in insertion order
+       self.index = SpatialHash(cell_size)  # features bucketed by position
+       
+   def add(self, feature_id, x, y, covariance=None):
+       if self.size == len(self.ids):
+           self.grow()
+       slot = self.size
+       self.size += 1
+       
+       self.ids[slot] = feature_id
+       self.x[slot] = x
+       self.y[slot] = y
+       self.covariance[slot] = np.eye(2) * NOISE_STD_COV if covariance is None else covariance
+       self.alive[slot] = True
+       self.slots[feature_id] = slot
+       self.index.insert(feature_id, x, y)
+       return Feature(self, feature_id)
+   
+   # drop dead slots, doubling the capacity if the live features still fill it
+   def grow(self):
+       live = np.nonzero(self.alive[:self.size])[0]
+       capacity = len(self.ids) * 2 if len(live) > len(self.ids) // 2 else len(self.ids)
+       
+       for name in ('ids', 'x', 'y', 'covariance', 'alive'):
+           old = getattr(self, name)
+           new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+           new[:len(live)] = old[live]
+           setattr(self, name, new)
+       self.ids[len(live):] = -1
+       self.size = len(live)
+       self.slots = {int(feature_id): slot for slot, feature_id in enumerate(self.ids[:self.size])}
+       
+   # replace the contents with the given features, in order (e.g. from a saved snapshot)
+   def load(self, feature_ids, x, y, covariance):
+       n = len(feature_ids)
+       capacity = max(INITIAL_CAPACITY, 2**int(np.ceil(np.log2(max(n, 1)))))
+       self.ids = np.full(capacity, -1, dtype=np.int64)
+       self.x = np.zeros(capacity)
+       self.y = np.zeros(capacity)
+       self.covariance = np.zeros((capacity, 2, 2))
+       self.alive = np.zeros(capacity, dtype=bool)
+       self.ids[:n] = feature_ids
+       self.x[:n] = x
+       self.y[:n] = y
+       self.covariance[:n] = covariance
+       self.alive[:n] = True
+       self.size = n
+       self.slots = {int(feature_id): slot for slot, feature_id in enumerate(self.ids[:n])}
+       
+       self.index = SpatialHash(self.index.cell_size)
+       for feature_id, fx, fy in zip(self.ids[:n].tolist(), self.x[:n].tolist(), self.y[:n].tolist()):
+           self.index.insert(feature_id, fx, fy)
+           
+   # apply Kalman updates for a batch of (feature id, observed x, observed y), using the closed-form 2x2 inverse
+   def kalman_update(self, feature_ids, obs_x, obs_y, noise=NOISE_MEAS_COV):
+       slots = np.array([self.slots[feature_id] for feature_id in feature_ids], dtype=np.intp)
+       obs_x = np.asarray(obs_x, dtype=float)
+       obs_y = np.asarray(obs_y, dtype=float)
+       
+       # repeated observations of one feature are applied in successive rounds
+       pending = np.arange(len(slots))
+       while len(pending):
+           _, first = np.unique(slots[pending], return_index=True)
+           batch = pending[first]
+           pending = np.delete(pending, first)
+           s = slots[batch]
+           
+           P = self.covariance[s]
+           S = P + np.eye(2) * noise
+           det = S[:, 0, 0] * S[:, 1, 1] - S[:, 0, 1] * S[:, 1, 0]
+           S_inv = np.empty_like(S)
+           S_inv[:, 0, 0] = S[:, 1, 1] / det
+           S_inv[:, 1, 1] = S[:, 0, 0] / det
+           S_inv[:, 0, 1] = -S[:, 0, 1] / det
+           S_inv[:, 1, 0] = -S[:, 1, 0] / det
+           K = P @ S_inv
+           
+           self.x[s] += K[:, 0, 0] * (obs_x[batch] - self.x[s])
+           self.y[s] += K[:, 1, 1] * (obs_y[batch] - self.y[s])
+           self.covariance[s] = (np.eye(2) - K) @ P
+           
+       for feature_id, slot in zip(feature_ids, slots):
+           self.index.move(feature_id, self.x[slot], self.y[slot])
+           
+   # ids and positions of all live features as (ids, x, y) arrays
+   def positions(self):
+       live = self.alive[:self.size]
+       return self.ids[:self.size][live], self.x[:self.size][live], self.y[:self.size][live]
+   
+   def __getitem__(self, feature_id):
+       if feature_id not in self.slots:
+           raise KeyError(feature_id)
+       return Feature(self, feature_id)
+   
+   def __delitem__(self, feature_id):
+       slot = self.slots.pop(feature_id)
+       self.alive[slot] = False
+       self.index.remove(feature_id)
+       
+   def __contains__(self, feature_id):
+       return feature_id in self.slots
+   
+   def __len__(self):
+       return len(self.slots)
+   
+   def __iter__(self):
+       return iter(self.slots)
+   
+   def keys(self):
+       return self.slots.keys()
+   
+   def values(self):
+       return [Feature(self, feature_id) for feature_id in self.slots]
+   
+   def items(self):
+       return [(feature_id, Feature(self, feature_id)) for feature_id in self.slots]
@@ -0,0 +1,134 @@
+import numpy as np
+from robot import Robot
+from sensor import Sensor, MEASUREMENT_COLUMNS, march_rays
+
+# define constants
+FORMATION_RADIUS = 60 # distance of escort robots' stations from the main object
+MAX_START_TRIES = 1000 # random draws allowed to find a free start position per escort robot
+
+# Class to define a fleet of robots that scan together and feed one shared map
+# robot 0 follows the main object itself, the others hold stations on a circle around it
+class Fleet:
+   def __init__(self, robots):
+       self.robots = robots
+       sensor = robots[0].sensor
+       self.max_range = sensor.max_range
+       self.num_rays = len(sensor.angles)
+       self.cos = sensor.cos
+       self.sin = sensor.sin
+       
+       # all hits of a frame in one block; robot i's hits are rows offsets[i]:offsets[i + 1]
+       self.measurements = np.zeros((len(robots) * self.num_rays, MEASUREMENT_COLUMNS))
+       self.offsets = np.zeros(len(robots) + 1, dtype=np.intp)
+       
+       angles = 2*np.pi * np.arange(len(robots) - 1) / max(len(robots) - 1, 1)
+       self.stations = [(0.0, 0.0)] + [(FORMATION_RADIUS * np.cos(a), FORMATION_RADIUS * np.sin(a))
+                                       for a in angles]
+       # casts rays on worker processes when set (see parallel_scan.py), in process otherwise
+       self.caster = None
+       
+   # a fleet of identical robots: the lead robot at (x, y), escorts at random free positions
+   # (or at (x, y) when none of MAX_START_TRIES draws is free)
+   @classmethod
+   def create(cls, count, x, y, env, rng, sensor_range, num_rays):
+       robots = [Robot(x, y, Sensor(max_range=sensor_range, num_rays=num_rays, rng=rng))]
+       for _ in range(count - 1):
+           for _ in range(MAX_START_TRIES):
+               start_x, start_y = rng.integers(0, env.width), rng.integers(0, env.height)
+               if not env.collision_field.blocked(start_x, start_y):
+                   break
+           else:
+               # no free position found: start on the lead robot rather than inside a wall
+               start_x, start_y = x, y
+           robots.append(Robot(start_x, start_y, Sensor(max_range=sensor_range, num_rays=num_rays, rng=rng)))
+       return cls(robots)
+   
+   def __len__(self):
+       return len(self.robots)
+   
+   def move(self, target_x, target_y, env):
+       for robot, (dx, dy) in zip(self.robots, self.stations):
+           robot.move(target_x + dx, target_y + dy, env)
+           
+   # scan with every robot, returning an (n, 4) view of all hits in robot order
+   # rays each robot's pose cache cannot serve are cast for all robots in one batch
+   def scan(self, env):
+       plans = []
+       for robot in self.robots:
+           sensor = robot.sensor
+           if sensor.cache is None:
+               plans.append((np.full(self.num_rays, -1), np.arange(self.num_rays), None))
+           else:
+               plans.append(sensor.cache.plan(sensor, robot.x, robot.y, env))
+       cast = self.cast(env, [rays for _, rays, _ in plans])
+       
+       total = 0
+       for i, (robot, (hit_step, rays, occluders)) in enumerate(zip(self.robots, plans)):
+           sensor = robot.sensor
+           if len(rays):
+               hit_step[rays] = cast[i]
+           if sensor.cache is not None:
+               sensor.cache.store(robot.x, robot.y, env, occluders, hit_step)
+           sensor.hit_steps = hit_step
+           sensor.rays_cast = len(rays)
+           
+           rays = np.nonzero(hit_step > 0)[0]
+           steps = hit_step[rays]
+           out = self.measurements[total:total + len(rays)]
+           angle, dist, ray_x, ray_y = out.T
+           np.take(sensor.angles, rays, out=angle)
+           np.add(robot.x, self.cos[rays] * steps, out=ray_x)
+           np.add(robot.y, self.sin[rays] * steps, out=ray_y)
+           np.sqrt((ray_x - robot.x)**2 + (ray_y - robot.y)**2, out=dist)
+           # Add noise to simulate sensor error
+           dist += sensor.rng.normal(0, sensor.noise_std, len(rays))
+           
+           total += len(rays)
+           self.offsets[i + 1] = total
+       return self.measurements[:total]
+   
+   # march the given rays of every robot together, returning each robot's first colliding steps
+   # (-1 when nothing is in range), in the order of its rays
+   def cast(self, env, rays):
+       if self.caster is not None:
+           return self.caster.cast(env, rays)
+       counts = np.array([len(r) for r in rays])
+       casting = np.flatnonzero(counts)
+       if len(casting) == 0:
+           return [np.zeros(0, dtype=np.intp) for _ in rays]
+       
+       # occupancy windows of the robots with rays to cast, stacked
+       size = 2 * self.max_range + 3
+       windows = np.zeros((len(self.robots), size, size), dtype=bool)
+       origin = np.zeros((len(self.robots), 2), dtype=np.intp)
+       for i in casting:
+           robot = self.robots[i]
+           grid, x0, y0 = env.sensor_window(robot.x, robot.y, self.max_range)
+           windows[i, :grid.shape[0], :grid.shape[1]] = grid
+           origin[i] = x0, y0
+       robot_x = np.array([robot.x for robot in self.robots], dtype=float)
+       robot_y = np.array([robot.y for robot in self.robots], dtype=float)
+       
+       # every requested ray of every robot, as (robot, ray) pairs
+       owner = np.repeat(np.arange(len(rays)), counts)
+       ray = np.concatenate(rays)
+       
+       def occupied(active, ray_x, ray_y):
+           r = owner[active]
+           gx = np.clip(ray_x - origin[r, 0, None], 0, size - 1)
+           gy = np.clip(ray_y - origin[r, 1, None], 0, size - 1)
+           return windows[r[:, None], gx, gy]
+       
+       hit_step = march_rays(robot_x[owner], robot_y[owner], self.cos[ray], self.sin[ray], self.max_range,
+                             env.width, env.height, occupied)
+       return np.split(hit_step, np.cumsum(counts)[:-1])
+   
+   # clusters of every robot's hits, with the index of the robot that saw each
+   def extract_features(self, measurements):
+       features = []
+       sources = []
+       for i, robot in enumerate(self.robots):
+           clusters = robot.sensor.extract_features(measurements[self.offsets[i]:self.offsets[i + 1]])
+           features.extend(clusters)
+           sources.extend([i] * len(clusters))
+       return features, np.array(sources, dtype=np.intp)
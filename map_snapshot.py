@@ -0,0 +1,114 @@
+import os
+import threading
+import numpy as np
+
+# define constants
+SNAPSHOT_VERSION = 1 # on-disk format version
+CHECKPOINT_INTERVAL_MS = 30000 # simulated time between background checkpoints
+
+# copy everything a snapshot holds out of the environment, as a dict of arrays
+# cheap enough to call on the simulation thread; writing can then happen elsewhere
+def capture(env):
+   ids, xs, ys = env.features.positions()
+   live = np.nonzero(env.features.alive[:env.features.size])[0]
+   tracks = list(env.dynamic_objects.items())
+   positions = [np.asarray(data['positions'], dtype=float).reshape(-1, 2) for _, data in tracks]
+   arrays = {
+       'version': np.array(SNAPSHOT_VERSION),
+       'map_size': np.array((env.width, env.height)),
+       'time_ms': np.array(env.clock(), dtype=float),
+       'feature_ids': ids,
+       'feature_xy': np.column_stack((xs, ys)),
+       'feature_covariance': env.features.covariance[live],
+       'feature_id_counter': np.array(env.feature_id_counter),
+       'track_ids': np.array([obj_id for obj_id, _ in tracks], dtype=np.int64),
+       'track_velocity': np.array([data['velocity'] for _, data in tracks], dtype=float),
+       'track_last_update': np.array([data['last_update'] for _, data in tracks], dtype=float),
+       'track_lengths': np.array([len(p) for p in positions], dtype=np.int64),
+       'track_positions': np.concatenate(positions) if positions else np.zeros((0, 2)),
+       'dynamic_object_counter': np.array(env.dynamic_object_counter),
+   }
+   if env.occupancy is not None:
+       arrays['occupancy'] = env.occupancy.log_odds.copy()
+   return arrays
+
+# write captured arrays to path, replacing any previous snapshot atomically
+def write(arrays, path):
+   temp = path + ".tmp.npz"
+   np.savez_compressed(temp, **arrays)
+   os.replace(temp, path)
+   
+def save_snapshot(env, path):
+   write(capture(env), path)
+
+# load a snapshot into a freshly built environment of the same map size
+# track times are shifted so their age relative to the environment's clock is preserved
+def load_snapshot(env, path):
+   with np.load(path) as data:
+       if int(data['version']) != SNAPSHOT_VERSION:
+           raise ValueError(f"map snapshot version {int(data['version'])} is not {SNAPSHOT_VERSION}")
+       if tuple(data['map_size']) != (env.width, env.height):
+           raise ValueError(f"map snapshot is for a {tuple(data['map_size'])} map, not {(env.width, env.height)}")
+           
+       xy = data['feature_xy']
+       env.features.load(data['feature_ids'], xy[:, 0], xy[:, 1], data['feature_covariance'])
+       env.feature_id_counter = int(data['feature_id_counter'])
+       
+       shift = env.clock() - float(data['time_ms'])
+       starts = np.concatenate(([0], np.cumsum(data['track_lengths'])))
+       positions = data['track_positions'].tolist()
+       env.dynamic_objects = {
+           int(obj_id): {'positions': [tuple(p) for p in positions[starts[i]:starts[i + 1]]],
+                         'velocity': float(data['track_velocity'][i]),
+                         'last_update': float(data['track_last_update'][i]) + shift}
+           for i, obj_id in enumerate(data['track_ids'])}
+       env.dynamic_object_counter = int(data['dynamic_object_counter'])
+       
+       if env.occupancy is not None and 'occupancy' in data:
+           env.occupancy.load(data['occupancy'])
+
+# Class to define periodic checkpointing: snapshots are captured on the simulation thread
+# and written by one background thread; a newer capture replaces one still waiting to be written
+class Checkpointer:
+   def __init__(self, env, path, interval_ms=CHECKPOINT_INTERVAL_MS):
+       self.env = env
+       self.path = path
+       self.interval_ms = interval_ms
+       self.last_ms = env.clock()
+       self.pending = None
+       self.running = True
+       self.written = 0
+       self.condition = threading.Condition()
+       self.thread = threading.Thread(target=self.work, daemon=True)
+       self.thread.start()
+       
+   # call once per frame; captures a snapshot when the interval has passed
+   def maybe_checkpoint(self):
+       now = self.env.clock()
+       if now - self.last_ms >= self.interval_ms:
+           self.last_ms = now
+           self.checkpoint()
+           
+   def checkpoint(self):
+       arrays = capture(self.env)
+       with self.condition:
+           self.pending = arrays
+           self.condition.notify()
+           
+   def work(self):
+       while True:
+           with self.condition:
+               self.condition.wait_for(lambda: self.pending is not None or not self.running)
+               if self.pending is None:
+                   return
+               arrays, self.pending = self.pending, None
+           write(arrays, self.path)
+           self.written += 1
+           
+   # write a final snapshot and stop the writer
+   def close(self):
+       self.checkpoint()
+       with self.condition:
+           self.running = False
+           self.condition.notify()
+       self.thread.join()
@@ -6,11 +6,12 @@ MAX_HISTORY = 20 # maximum history of objects
 
 # Class to define moving objects
 class MovingObject:
-   def __init__(self, x, y, velocity=VELOCITY):
+   def __init__(self, x, y, velocity=VELOCITY, rng=None):
        self.x = x
        self.y = y
        self.velocity = velocity
-       self.theta = np.random.uniform(0, 2*np.pi)
+       self.rng = np.random.default_rng() if rng is None else rng
+       self.theta = self.rng.uniform(0, 2*np.pi)
        self.history = [(x, y)]
        
    # update position
@@ -23,7 +24,7 @@ class MovingObject:
        
        # Collision detection with walls/objects
        if env.is_collision_object(new_x, new_y):
-           self.theta = np.random.uniform(0, 2*np.pi)
+           self.theta = self.rng.uniform(0, 2*np.pi)
            return
            
        self.x = new_x
@@ -0,0 +1,130 @@
+import numpy as np
+import pygame
+
+# define constants
+CELL_SIZE = 4 # pixels per grid cell
+LOG_ODDS_OCCUPIED = 0.85 # log-odds added to a cell a ray ends in
+LOG_ODDS_FREE = -0.4 # log-odds added to a cell a ray passes through
+LOG_ODDS_LIMIT = 5.0 # log-odds are clamped to +/- this, so cells can change their mind
+PYRAMID_LEVELS = 4 # level k holds the max log-odds over 2^k x 2^k cells
+OCCUPIED_THRESHOLD = 0.0 # log-odds above this count as occupied
+
+# Class to define a log-odds occupancy grid built incrementally from scans
+# grids are indexed [cx, cy], like the rest of the array state
+class OccupancyGrid:
+   def __init__(self, width, height, cell_size=CELL_SIZE, levels=PYRAMID_LEVELS):
+       self.width = width
+       self.height = height
+       self.cell_size = cell_size
+       self.shape = (-(-width // cell_size), -(-height // cell_size))
+       
+       # pad so every pyramid level tiles the finest one exactly; padding stays unknown (0)
+       block = 2**(levels - 1)
+       padded = tuple(-(-n // block) * block for n in self.shape)
+       self.pyramid = [np.zeros((padded[0] >> k, padded[1] >> k)) for k in range(levels)]
+       self.updates = 0
+       self.last_scans = {}  # {sensor: (pose, hit steps, rasterized change)} of each sensor's last scan
+       
+   @property
+   def log_odds(self):
+       return self.pyramid[0][:self.shape[0], :self.shape[1]]
+   
+   # replace the log-odds (e.g. from a saved snapshot) and rebuild the pyramid
+   def load(self, log_odds):
+       self.log_odds[...] = log_odds
+       self.last_scans = {}
+       self.update_pyramid(0, 0, *self.shape)
+       
+   # occupancy probability of every cell
+   def probabilities(self):
+       return 1 - 1 / (1 + np.exp(self.log_odds))
+   
+   # integrate one scan, given the sensor's per-ray first hit steps (-1 when nothing is in range)
+   def update(self, robot_x, robot_y, sensor):
+       # a sensor re-observing the same hits from the same pose rasterizes to the same cells
+       last = self.last_scans.get(sensor)
+       if last is not None and last[0] == (robot_x, robot_y) and np.array_equal(last[1], sensor.hit_steps):
+           bounds, delta = last[2]
+       else:
+           bounds, delta = self.rasterize(robot_x, robot_y, sensor)
+           self.last_scans[sensor] = ((robot_x, robot_y), sensor.hit_steps.copy(), (bounds, delta))
+       if delta is None:
+           return
+       
+       cx0, cy0, cx1, cy1 = bounds
+       cells = self.pyramid[0][cx0:cx1, cy0:cy1]
+       cells += delta
+       np.clip(cells, -LOG_ODDS_LIMIT, LOG_ODDS_LIMIT, out=cells)
+       self.update_pyramid(cx0, cy0, cx1, cy1)
+       self.updates += 1
+       
+   # log-odds change of one scan over the cells inside its window, as ((cx0, cy0, cx1, cy1), delta)
+   def rasterize(self, robot_x, robot_y, sensor):
+       hit_step = sensor.hit_steps
+       max_range = sensor.max_range
+       size = self.cell_size
+       
+       # only cells inside the scan window are touched
+       cx0 = max(int((robot_x - max_range) // size), 0)
+       cy0 = max(int((robot_y - max_range) // size), 0)
+       cx1 = min(int((robot_x + max_range) // size) + 1, self.shape[0])
+       cy1 = min(int((robot_y + max_range) // size) + 1, self.shape[1])
+       if cx0 >= cx1 or cy0 >= cy1:
+           return None, None
+       
+       # rasterize every ray at once, on the same pixels the sensor marched
+       steps = np.arange(1, max_range + 1)
+       px = np.trunc(robot_x + np.outer(sensor.cos, steps)).astype(np.intp)
+       py = np.trunc(robot_y + np.outer(sensor.sin, steps)).astype(np.intp)
+       inside = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+       end = np.where(hit_step > 0, hit_step, max_range + 1)[:, None]
+       free = inside & (steps < end)
+       occupied = inside & (steps == end)
+       
+       # each cell is updated at most once per scan, and a hit wins over a pass-through
+       window = (cx1 - cx0, cy1 - cy0)
+       free_cells = np.zeros(window, dtype=bool)
+       occupied_cells = np.zeros(window, dtype=bool)
+       free_cells[px[free] // size - cx0, py[free] // size - cy0] = True
+       occupied_cells[px[occupied] // size - cx0, py[occupied] // size - cy0] = True
+       free_cells &= ~occupied_cells
+       return (cx0, cy0, cx1, cy1), LOG_ODDS_FREE * free_cells + LOG_ODDS_OCCUPIED * occupied_cells
+   
+   # rebuild the coarser levels over the blocks covering the changed cells
+   def update_pyramid(self, cx0, cy0, cx1, cy1):
+       for k in range(1, len(self.pyramid)):
+           cx0, cy0 = cx0 // 2, cy0 // 2
+           cx1, cy1 = -(-cx1 // 2), -(-cy1 // 2)
+           fine = self.pyramid[k - 1][2*cx0:2*cx1, 2*cy0:2*cy1]
+           self.pyramid[k][cx0:cx1, cy0:cy1] = fine.reshape(cx1 - cx0, 2, cy1 - cy0, 2).max(axis=(1, 3))
+           
+   # whether the given pixel positions fall in occupied cells at a pyramid level (0 is finest)
+   def occupied(self, xs, ys, level=0):
+       shift = self.cell_size * 2**level
+       cx = np.clip(np.asarray(xs) // shift, 0, self.pyramid[level].shape[0] - 1).astype(np.intp)
+       cy = np.clip(np.asarray(ys) // shift, 0, self.pyramid[level].shape[1] - 1).astype(np.intp)
+       return self.pyramid[level][cx, cy] > OCCUPIED_THRESHOLD
+   
+   # whether any cell touched by the pixel rectangle [x0, x1) x [y0, y1) is occupied, searched coarse to fine:
+   # a free covering block proves the region free, an occupied block fully inside it proves it occupied
+   def region_occupied(self, x0, y0, x1, y1):
+       for level in range(len(self.pyramid) - 1, -1, -1):
+           grid = self.pyramid[level] > OCCUPIED_THRESHOLD
+           shift = self.cell_size * 2**level
+           ox0, oy0 = max(int(x0 // shift), 0), max(int(y0 // shift), 0)
+           ox1, oy1 = min(int(-(-x1 // shift)), grid.shape[0]), min(int(-(-y1 // shift)), grid.shape[1])
+           if not grid[ox0:ox1, oy0:oy1].any():
+               return False
+           ix0, iy0 = max(int(-(-x0 // shift)), 0), max(int(-(-y0 // shift)), 0)
+           ix1, iy1 = int(x1 // shift), int(y1 // shift)
+           if level == 0 or grid[ix0:ix1, iy0:iy1].any():
+               return True
+       return True
+   
+   # save the grid as <path>.npy (log-odds) and <path>.png (grey: white free, black occupied, mid unknown)
+   def save(self, path):
+       np.save(path + ".npy", self.log_odds)
+       grey = (255 * (1 - self.probabilities())).astype(np.uint8)
+       pixels = np.repeat(np.repeat(grey, self.cell_size, axis=0), self.cell_size, axis=1)
+       pixels = pixels[:self.width, :self.height]
+       pygame.image.save(pygame.surfarray.make_surface(np.dstack((pixels, pixels, pixels))), path + ".png")
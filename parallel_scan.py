@@ -0,0 +1,144 @@
+import multiprocessing
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from sensor import Sensor
+from scene import occupancy_window
+from tiled_map import TiledMap
+
+# define constants
+MIN_PAIRS_PER_WORKER = 256 # smallest shard worth sending to a worker
+
+# a boolean or numeric array living in a shared memory block
+def shared_array(shape, dtype, name=None):
+   size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+   block = shared_memory.SharedMemory(name=name, create=name is None, size=0 if name else size)
+   return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+# Class to define the world as a worker sees it: the shared static walls plus the frame's
+# moving objects and main object, enough for a Sensor to cast rays
+class SharedWorld:
+   def __init__(self, walls, objects, main):
+       self.walls = walls
+       self.objects = objects
+       self.main = main
+       self.width, self.height = walls.shape
+       
+   def sensor_window(self, x, y, radius):
+       return occupancy_window(self.walls, x, y, radius, self.objects[:, 0], self.objects[:, 1],
+                               self.main[0], self.main[1])
+
+# worker loop: attach to the shared blocks once, then cast one contiguous shard of
+# (robot, ray) pairs per message, writing first hit steps into the shared result buffer
+def scan_worker(conn, names, shapes, max_range, num_rays):
+   blocks, arrays = zip(*[shared_array(shape, dtype, name) for name, (shape, dtype) in zip(names, shapes)])
+   walls, poses, objects, main, pairs, result = arrays
+   world = SharedWorld(walls, objects, main)
+   sensor = Sensor(max_range=max_range, num_rays=num_rays, use_cache=False)
+   
+   while True:
+       task = conn.recv()
+       if task is None:
+           break
+       start, stop = task
+       owner, ray = pairs[start:stop, 0], pairs[start:stop, 1]
+       # one window per robot: split the shard where the owner changes
+       bounds = np.concatenate(([0], np.flatnonzero(np.diff(owner)) + 1, [len(owner)]))
+       for a, b in zip(bounds[:-1], bounds[1:]):
+           x, y = poses[owner[a]]
+           result[start + a:start + b] = sensor.cast(x, y, world, ray[a:b])
+       conn.send(stop - start)
+   
+   del walls, poses, objects, main, pairs, result, arrays, world
+   for block in blocks:
+       block.close()
+
+# stop the workers and release the shared memory blocks; runs once, from close() or when the
+# caster is collected or the interpreter exits without close() having been called
+def shutdown(connections, workers, blocks):
+   for conn in connections:
+       try:
+           conn.send(None)
+       except (BrokenPipeError, OSError):
+           pass
+   for worker in workers:
+       worker.join()
+   for conn in connections:
+       conn.close()
+   for block in blocks:
+       try:
+           block.close()
+       except BufferError:
+           pass  # arrays still view the block; unlinking below still frees it once they are gone
+       block.unlink()
+
+# Class to define ray casting on a persistent pool of worker processes
+# the static walls are copied into shared memory once; each frame only the poses of robots,
+# moving objects and the main object are written to shared memory, workers are sent the bounds
+# of their shard of (robot, ray) pairs, and write first hit steps into a shared result buffer
+class ParallelCaster:
+   def __init__(self, env, processes):
+       if isinstance(env.wall_mask, TiledMap):
+           raise ValueError("parallel scanning needs an in-memory map, not a tiled one")
+       fleet = env.fleet
+       self.processes = processes
+       self.static_version = env.static_version
+       
+       shapes = [(env.wall_mask.shape, bool),
+                 ((len(fleet), 2), float),
+                 ((len(env.moving_objects.x), 2), float),
+                 ((2,), float),
+                 ((len(fleet) * fleet.num_rays, 2), np.intp),
+                 ((len(fleet) * fleet.num_rays,), np.intp)]
+       self.blocks, arrays = zip(*[shared_array(shape, dtype) for shape, dtype in shapes])
+       self.walls, self.poses, self.objects, self.main, self.pairs, self.result = arrays
+       self.walls[:] = env.wall_mask
+       
+       # registered before starting workers, so a failed start still releases what exists
+       self.connections = []
+       self.workers = []
+       self.finalizer = weakref.finalize(self, shutdown, self.connections, self.workers, self.blocks)
+       
+       names = [block.name for block in self.blocks]
+       context = multiprocessing.get_context("spawn")
+       for _ in range(processes):
+           parent, child = context.Pipe()
+           worker = context.Process(target=scan_worker, daemon=True,
+                                    args=(child, names, shapes, fleet.max_range, fleet.num_rays))
+           worker.start()
+           child.close()
+           self.connections.append(parent)
+           self.workers.append(worker)
+       
+   # same contract as Fleet.cast: each robot's first colliding steps (-1 when nothing is in range)
+   def cast(self, env, rays):
+       counts = np.array([len(r) for r in rays])
+       total = int(counts.sum())
+       if total == 0:
+           return [np.zeros(0, dtype=np.intp) for _ in rays]
+       
+       if env.static_version != self.static_version:
+           self.walls[:] = env.wall_mask
+           self.static_version = env.static_version
+       self.poses[:] = [(robot.x, robot.y) for robot in env.robots]
+       self.objects[:, 0] = env.moving_objects.x
+       self.objects[:, 1] = env.moving_objects.y
+       self.main[:] = env.main_object.x, env.main_object.y
+       self.pairs[:total, 0] = np.repeat(np.arange(len(rays)), counts)
+       self.pairs[:total, 1] = np.concatenate(rays)
+       
+       # contiguous shards, so each worker marches an angular sector of as few robots as possible
+       shards = max(min(self.processes, total // MIN_PAIRS_PER_WORKER), 1)
+       bounds = np.linspace(0, total, shards + 1).astype(int)
+       for conn, start, stop in zip(self.connections, bounds[:-1], bounds[1:]):
+           conn.send((int(start), int(stop)))
+       for conn in self.connections[:shards]:
+           conn.recv()
+       return np.split(self.result[:total].copy(), np.cumsum(counts)[:-1])
+       
+   # stop the workers and release the shared memory
+   def close(self):
+       if not self.finalizer.alive:
+           return
+       del self.walls, self.poses, self.objects, self.main, self.pairs, self.result
+       self.finalizer()
\ No newline at end of file
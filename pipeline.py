@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+
+# define constants
+LATENCY_HISTORY = 300 # sensor-to-display latencies kept for statistics
+
+Point = namedtuple('Point', 'x y')
+FeaturePoint = namedtuple('FeaturePoint', 'id x y')
+RobotState = namedtuple('RobotState', 'x y path sensor')
+
+# Class to define an immutable copy of everything the renderer reads from the environment
+class Snapshot:
+   def __init__(self, env, measurements, sensed_at):
+       self.sensed_at = sensed_at  # perf_counter time the frame's sensing started
+       self.measurements = np.array(measurements)  # the fleet reuses its buffer, so copy
+       ids, xs, ys = env.features.positions()
+       self.features = {fid: FeaturePoint(fid, x, y)
+                        for fid, x, y in zip(ids.tolist(), xs.tolist(), ys.tolist())}
+       self.moving_objects = [Point(x, y) for x, y in env.moving_objects.positions().tolist()]
+       self.main_object = Point(env.main_object.x, env.main_object.y)
+       self.robots = [RobotState(robot.x, robot.y, list(robot.path), robot.sensor) for robot in env.robots]
+       self.robot = self.robots[0]
+       self.current_warning = env.current_warning
+
+# Class to define a two-stage pipeline: a worker thread senses and estimates while the
+# main thread renders the last completed frame
+class PipelinedRunner:
+   def __init__(self, env, on_frame=None):
+       self.env = env
+       self.on_frame = on_frame  # called on the worker after each frame, while it owns the environment
+       self.condition = threading.Condition()
+       self.command = (0, 0)  # latest main object command, read by the worker each frame
+       self.ready = None  # completed snapshot not yet taken by the display (the back buffer)
+       self.running = False
+       self.error = None  # exception that stopped the worker, re-raised by take()
+       self.latencies = deque(maxlen=LATENCY_HISTORY)
+       self.thread = threading.Thread(target=self.work, daemon=True)
+       
+   def start(self):
+       self.running = True
+       self.thread.start()
+       
+   def stop(self):
+       with self.condition:
+           self.running = False
+           self.condition.notify_all()
+       self.thread.join()
+       
+   # main object command for the frames computed from now on
+   def submit(self, command):
+       with self.condition:
+           self.command = command
+           
+   # worker: compute a frame, then wait until the display takes it, so the estimate
+   # is never more than one frame ahead of what is shown
+   def work(self):
+       try:
+           while True:
+               with self.condition:
+                   if not self.running:
+                       return
+                   command = self.command
+               sensed_at = time.perf_counter()
+               measurements = self.env.step(command=command)
+               if self.on_frame:
+                   self.on_frame()
+               snapshot = Snapshot(self.env, measurements, sensed_at)
+               with self.condition:
+                   while self.ready is not None and self.running:
+                       self.condition.wait()
+                   self.ready = snapshot
+                   self.condition.notify_all()
+       except Exception as error:
+           # hand the failure to the display thread instead of leaving it waiting for frames
+           with self.condition:
+               self.error = error
+               self.condition.notify_all()
+               
+   # take the newest completed frame (the front buffer), waiting for one if needed;
+   # raises the exception that stopped the worker, if any
+   def take(self, timeout=None):
+       with self.condition:
+           if not self.condition.wait_for(lambda: self.ready is not None or self.error is not None, timeout):
+               return None
+           if self.error is not None:
+               raise self.error
+           snapshot, self.ready = self.ready, None
+           self.condition.notify_all()
+       return snapshot
+   
+   # record that a frame has reached the display
+   def presented(self, snapshot):
+       self.latencies.append((time.perf_counter() - snapshot.sensed_at) * 1000.0)
+       
+   # sensor-to-display latency percentiles in ms, {50: ms, 95: ms, 99: ms}
+   def latency_percentiles(self):
+       if not self.latencies:
+           return {50: 0.0, 95: 0.0, 99: 0.0}
+       return dict(zip((50, 95, 99), np.percentile(self.latencies, (50, 95, 99)).tolist()))
@@ -0,0 +1,45 @@
+import numpy as np
+
+# define constants
+WARNING_DISTANCE = 30 # obstacles closer than this raise a proximity warning
+MIN_DISTANCE = 5 # obstacles closer than this are the query object itself
+NO_OBSTACLE = -1 # kind: nothing within radius
+HIT = 0 # kind: a scan hit, identified by its row in hit_xy
+FEATURE = 1 # kind: a mapped feature, identified by its feature id
+
+# nearest obstacle to each query point, from scan hits and mapped features, in one batched reduction
+# points: (Q, 2) query positions; hit_xy: (N, 2) measurement positions; feature_map: optional FeatureMap
+# returns (distance, bearing, kind, source) arrays of length Q: kind is HIT or FEATURE and source the
+# hit's row in hit_xy or the feature's id; distance is inf, kind NO_OBSTACLE and source -1 when
+# nothing lies within radius
+def nearest_obstacles(points, hit_xy, feature_map=None, radius=WARNING_DISTANCE, min_distance=MIN_DISTANCE):
+   points = np.asarray(points, dtype=float).reshape(-1, 2)
+   candidates = [np.asarray(hit_xy, dtype=float).reshape(-1, 2)]
+   candidate_ids = [np.arange(len(candidates[0]))]
+   
+   # only features the index places within radius of some query point can be nearest
+   if feature_map is not None and len(feature_map):
+       feature_ids = set()
+       for x, y in points:
+           feature_ids.update(feature_map.index.query(x, y, radius))
+       feature_ids = sorted(feature_ids)
+       slots = [feature_map.slots[feature_id] for feature_id in feature_ids]
+       candidates.append(np.column_stack((feature_map.x[slots], feature_map.y[slots])))
+       candidate_ids.append(np.array(feature_ids, dtype=np.intp))
+   obstacles = np.concatenate(candidates)
+   ids = np.concatenate(candidate_ids).astype(np.intp)
+   num_hits = len(candidates[0])
+   
+   delta = obstacles[None, :, :] - points[:, None, :]
+   distance = np.hypot(delta[..., 0], delta[..., 1])
+   distance[(distance < min_distance) | (distance > radius)] = np.inf
+   
+   q = np.arange(len(points))
+   source = np.argmin(distance, axis=1) if obstacles.size else np.zeros(len(points), dtype=np.intp)
+   nearest = distance[q, source] if obstacles.size else np.full(len(points), np.inf)
+   bearing = np.zeros(len(points))
+   found = np.isfinite(nearest)
+   bearing[found] = np.arctan2(delta[q[found], source[found], 1], delta[q[found], source[found], 0])
+   kind = np.where(found, np.where(source < num_hits, HIT, FEATURE), NO_OBSTACLE)
+   source = np.where(found, ids[source] if obstacles.size else -1, -1)
+   return nearest, bearing, kind, source
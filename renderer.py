@@ -0,0 +1,133 @@
+import pygame
+import numpy as np
+from robot import OBJ_ZONE
+
+# define colors
+BLACK = (0, 0, 0, 255) # walls 
+WHITE = (255, 255, 255, 255) # background
+RED = (255, 0, 0, 255) # robot
+GREEN = (0, 255, 0, 255) # moving objects
+BLUE = (0, 0, 255, 255) # features
+GREY = (128, 128, 128, 255) # path and object zone
+YELLOW = (255, 255, 0, 255) # dynamic objects
+
+# Class to draw the environment state onto a surface, redrawing only the regions that changed
+class Renderer:
+   def __init__(self, env, surface):
+       self.env = env
+       self.surface = surface
+       pygame.font.init()
+       self.font = pygame.font.Font(None, 36)
+       self.overlay_font = pygame.font.Font(None, 20)
+       self.show_telemetry = False  # frame-time overlay, needs env.telemetry enabled
+       
+       # cached background (floor plan on white), in the surface's pixel format
+       self.background = pygame.Surface(surface.get_size(), 0, surface)
+       self.background.fill(WHITE)
+       self.background.blit(env.floor_plan, (0, 0))
+       
+       self.transient_rects = []  # rects of items redrawn every frame, erased next frame
+       self.feature_rects = {}  # {feature id: (rect, position)} of drawn features
+       self.full_redraw = True
+       
+   # draw the environment, or a snapshot shaped like it (see pipeline.Snapshot)
+   def draw(self, measurements, state=None):
+       env = self.env if state is None else state
+       screen = self.surface
+       
+       # restore the background under last frame's transient items and moved/removed features
+       if self.full_redraw:
+           screen.blit(self.background, (0, 0))
+           restored = [screen.get_rect()]
+           self.feature_rects = {}
+       else:
+           restored = self.transient_rects
+       
+       current = {feature.id: (int(feature.x), int(feature.y)) for feature in env.features.values()}
+       stale = [feat_id for feat_id, (rect, pos) in self.feature_rects.items()
+                if current.get(feat_id) != pos]
+       restored = restored + [self.feature_rects.pop(feat_id)[0] for feat_id in stale]
+       if not self.full_redraw:
+           for rect in restored:
+               screen.blit(self.background, rect, rect)
+       
+       transient = []
+       
+       # Draw measurements
+       hits = np.asarray(measurements, dtype=float).reshape(-1, 4)[:, 2:4].astype(int).tolist()
+       rects = [pygame.draw.circle(screen, YELLOW, hit, 5) for hit in hits]
+       if rects:
+           transient.append(rects[0].unionall(rects[1:]))
+       
+       # Draw features that are new, moved, or were erased or covered by this frame's drawing
+       drawn = []
+       covered = restored + transient
+       for feat_id, pos in current.items():
+           if feat_id in self.feature_rects and self.feature_rects[feat_id][0].collidelist(covered) < 0:
+               continue
+           rect = pygame.draw.circle(screen, BLUE, pos, 5)
+           self.feature_rects[feat_id] = (rect, pos)
+           drawn.append(rect)
+       
+       # Draw moving objects
+       for obj in env.moving_objects:
+           transient.append(pygame.draw.circle(screen, GREEN, 
+                                               (int(obj.x), int(obj.y)), 10))
+           
+       # Draw main object
+       transient.append(pygame.draw.line(screen, GREEN, 
+                        (int(env.main_object.x-5), int(env.main_object.y-5)),
+                        (int(env.main_object.x+5), int(env.main_object.y+5)), 2))
+       transient.append(pygame.draw.line(screen, GREEN, 
+                        (int(env.main_object.x-5), int(env.main_object.y+5)),
+                        (int(env.main_object.x+5), int(env.main_object.y-5)), 2))
+       transient.append(pygame.draw.circle(screen, GREY, 
+                        (int(env.main_object.x), int(env.main_object.y)), int(OBJ_ZONE), 1))
+       
+       for robot in env.robots:
+           # Draw robot
+           transient.append(pygame.draw.circle(screen, RED, 
+                            (int(robot.x), int(robot.y)), 10))
+           transient.append(pygame.draw.circle(screen, GREY, 
+                            (int(robot.x), int(robot.y)), robot.sensor.max_range, 1))
+           
+           # Draw robot path
+           if len(robot.path) > 1:
+               transient.append(pygame.draw.lines(screen, GREY, False,
+                                [(int(x), int(y)) for x, y in robot.path]))
+       
+       if env.current_warning:
+           warning_text = self.font.render(env.current_warning, True, RED)
+           warning_rect = warning_text.get_rect()
+           warning_rect.topleft = (10, 10)  # Position in top-left corner
+           transient.append(screen.blit(warning_text, warning_rect))
+       
+       if self.show_telemetry and self.env.telemetry.enabled:
+           transient.extend(self.draw_telemetry())
+       
+       # only present the changed regions, and only when drawing to the display
+       if screen is pygame.display.get_surface():
+           if self.full_redraw:
+               pygame.display.flip()
+           else:
+               pygame.display.update(restored + drawn + transient)
+       self.transient_rects = transient
+       self.full_redraw = False
+           
+   # frame latency percentiles, last-frame stage timings and counters in the top-right corner
+   def draw_telemetry(self):
+       telemetry = self.env.telemetry
+       stages, counts = telemetry.last_frame()
+       percentiles = telemetry.percentiles()
+       lines = ["frame p50 {:.1f} / p95 {:.1f} / p99 {:.1f} ms".format(
+                    percentiles[50], percentiles[95], percentiles[99])]
+       lines += [f"{name}: {ms:.2f} ms" for name, ms in stages.items()]
+       lines += [f"{name}: {value}" for name, value in counts.items()]
+       
+       rects = []
+       y = 10
+       for line in lines:
+           text = self.overlay_font.render(line, True, BLACK, WHITE)
+           rects.append(self.surface.blit(text, (self.surface.get_width() - text.get_width() - 10, y)))
+           y += text.get_height()
+       return rects
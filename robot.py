@@ -9,12 +9,12 @@ MAX_PATH_LENGTH = 20 # maximum path length
 
 
 class Robot:
-   def __init__(self, x, y):
+   def __init__(self, x, y, sensor=None):
        self.x = x
        self.y = y
        self.theta = 0
        self.velocity = ROBOT_VELOCITY
-       self.sensor = Sensor()
+       self.sensor = Sensor() if sensor is None else sensor
        self.path = [(x, y)]
        
    # move the robot
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+import numpy as np
+
+# define constants
+MAX_ENTRIES = 8 # cached poses kept, least recently used evicted first
+SECTOR_MARGIN = 3 # extra pixels around an object when choosing rays to re-cast
+
+# Class to define a cache of clean (noise-free) ray hits keyed on robot pose
+class ScanCache:
+   def __init__(self, max_entries=MAX_ENTRIES):
+       self.max_entries = max_entries
+       self.entries = OrderedDict()  # {(x, y): {'static': v, 'dynamic': v, 'occluders': array, 'hit_step': array}}
+       self.hits = 0  # scans served entirely from the cache
+       self.partial = 0  # scans that re-cast only the sectors of moved objects
+       self.misses = 0  # scans cast from scratch
+       self.rays_cast = 0
+       self.rays_requested = 0
+       
+   # what can be reused at this pose, as (hit_step, rays still to cast into it, occluders);
+   # split from store so several sensors can cast their missing rays in one batch (see Fleet.scan)
+   def plan(self, sensor, robot_x, robot_y, env):
+       key = (float(robot_x), float(robot_y))
+       occluders = env.occluders()
+       entry = self.entries.get(key)
+       num_rays = len(sensor.angles)
+       self.rays_requested += num_rays
+       
+       if (entry is None or entry['static'] != env.static_version or
+           len(entry['occluders']) != len(occluders)):
+           self.misses += 1
+           hit_step = np.full(num_rays, -1)
+           rays = np.arange(num_rays)
+       elif entry['dynamic'] == env.dynamic_version:
+           self.hits += 1
+           hit_step = entry['hit_step']
+           rays = np.zeros(0, dtype=np.intp)
+       else:
+           # only rays through the old or new footprint of a moved object can change
+           moved = np.any(entry['occluders'] != occluders, axis=1)
+           rays = self.sector_rays(sensor, robot_x, robot_y,
+                                   np.concatenate((entry['occluders'][moved], occluders[moved])))
+           hit_step = entry['hit_step'].copy()
+           self.partial += 1
+       self.rays_cast += len(rays)
+       return hit_step, rays, occluders
+   
+   # remember the completed hit steps at this pose
+   def store(self, robot_x, robot_y, env, occluders, hit_step):
+       key = (float(robot_x), float(robot_y))
+       self.entries[key] = {'static': env.static_version, 'dynamic': env.dynamic_version,
+                            'occluders': occluders, 'hit_step': hit_step}
+       self.entries.move_to_end(key)
+       while len(self.entries) > self.max_entries:
+           self.entries.popitem(last=False)
+           
+   # indices of rays passing within the angular extent of any of the (x, y, radius) discs
+   def sector_rays(self, sensor, robot_x, robot_y, discs):
+       dx = discs[:, 0] - robot_x
+       dy = discs[:, 1] - robot_y
+       reach = discs[:, 2] + SECTOR_MARGIN
+       dist = np.sqrt(dx**2 + dy**2)
+       near = dist < sensor.max_range + reach
+       if not near.any():
+           return np.zeros(0, dtype=np.intp)
+       dx, dy, reach, dist = dx[near], dy[near], reach[near], dist[near]
+       
+       # a disc containing the robot covers every ray
+       if np.any(dist <= reach):
+           return np.arange(len(sensor.angles))
+       half_width = np.arcsin(reach / dist)
+       center = np.arctan2(dy, dx) % (2*np.pi)
+       
+       # rays are evenly spaced and periodic (the last ray repeats the first), so mark each
+       # disc's index interval in a difference array over three periods and fold it back
+       period = len(sensor.angles) - 1
+       spacing = 2*np.pi / period
+       lo = np.floor((center - half_width) / spacing).astype(np.intp) + period
+       hi = np.ceil((center + half_width) / spacing).astype(np.intp) + period + 1
+       marks = np.zeros(3 * period + 1, dtype=np.intp)
+       np.add.at(marks, lo, 1)
+       np.add.at(marks, hi, -1)
+       covered = (np.cumsum(marks)[:3 * period] > 0).reshape(3, period).any(axis=0)
+       return np.nonzero(np.append(covered, covered[0]))[0]
+   
+   # fraction of requested rays served without casting
+   def hit_rate(self):
+       if self.rays_requested == 0:
+           return 0.0
+       return 1.0 - self.rays_cast / self.rays_requested
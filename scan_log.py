@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+# define constants
+LOG_VERSION = 1 # on-disk format version
+CHUNK_FRAMES = 512 # frames buffered before a chunk is written
+FRAME_DTYPE = np.dtype([('time_ms', 'f8'), ('robot_x', 'f8'), ('robot_y', 'f8'),
+                        ('main_x', 'f8'), ('main_y', 'f8'),
+                        ('hit_start', 'i8'), ('hit_count', 'i8'),
+                        ('object_start', 'i8'), ('object_count', 'i8')])
+
+# Class to define an append-only, chunked, columnar log of scans and ground truth
+# layout: <dir>/index.json plus, per chunk, <chunk>_frames.npy, <chunk>_hits.npy (angle, dist, x, y)
+# and <chunk>_objects.npy (x, y) with offsets into them stored per frame
+class ScanLogWriter:
+   def __init__(self, directory, chunk_frames=CHUNK_FRAMES):
+       self.directory = directory
+       self.chunk_frames = chunk_frames
+       os.makedirs(directory, exist_ok=True)
+       
+       self.index_path = os.path.join(directory, "index.json")
+       if os.path.exists(self.index_path):
+           with open(self.index_path) as f:
+               self.index = json.load(f)
+           if self.index['version'] != LOG_VERSION:
+               raise ValueError(f"scan log version {self.index['version']} is not {LOG_VERSION}")
+       else:
+           self.index = {'version': LOG_VERSION, 'chunks': []}
+       self.reset_buffers()
+       
+   def reset_buffers(self):
+       self.frames = []
+       self.hits = []
+       self.objects = []
+       self.hit_total = 0
+       self.object_total = 0
+       
+   def record(self, time_ms, robot_xy, main_xy, object_xy, measurements):
+       # copy: the fleet overwrites its measurement block on the next scan
+       hits = np.array(measurements, dtype=float).reshape(-1, 4)
+       objects = np.asarray(object_xy, dtype=float).reshape(-1, 2)
+       self.frames.append((time_ms, robot_xy[0], robot_xy[1], main_xy[0], main_xy[1],
+                           self.hit_total, len(hits), self.object_total, len(objects)))
+       self.hits.append(hits)
+       self.objects.append(objects)
+       self.hit_total += len(hits)
+       self.object_total += len(objects)
+       if len(self.frames) >= self.chunk_frames:
+           self.flush()
+           
+   # record the current state of an environment; frames hold one robot pose, so fleets cannot be logged
+   def record_env(self, env, measurements):
+       if len(env.robots) > 1:
+           raise ValueError("scan logs record a single robot")
+       self.record(env.clock(), (env.robot.x, env.robot.y),
+                   (env.main_object.x, env.main_object.y),
+                   env.moving_objects.positions(), measurements)
+       
+   # write buffered frames as a new chunk and publish it in the index
+   def flush(self):
+       if not self.frames:
+           return
+       name = f"chunk_{len(self.index['chunks']):05d}"
+       base = os.path.join(self.directory, name)
+       np.save(base + "_frames.npy", np.array(self.frames, dtype=FRAME_DTYPE))
+       np.save(base + "_hits.npy", np.concatenate(self.hits))
+       np.save(base + "_objects.npy", np.concatenate(self.objects))
+       
+       self.index['chunks'].append({'name': name, 'frames': len(self.frames)})
+       # write the index last and atomically, so readers never see a partial chunk
+       with open(self.index_path + ".tmp", "w") as f:
+           json.dump(self.index, f)
+       os.replace(self.index_path + ".tmp", self.index_path)
+       self.reset_buffers()
+       
+   def close(self):
+       self.flush()
+
+# Class to define a memory-mapped reader over a scan log
+class ScanLogReader:
+   def __init__(self, directory):
+       with open(os.path.join(directory, "index.json")) as f:
+           self.index = json.load(f)
+       if self.index['version'] != LOG_VERSION:
+           raise ValueError(f"scan log version {self.index['version']} is not {LOG_VERSION}")
+       self.chunks = []
+       for chunk in self.index['chunks']:
+           base = os.path.join(directory, chunk['name'])
+           self.chunks.append(tuple(np.load(base + suffix, mmap_mode='r')
+                                    for suffix in ("_frames.npy", "_hits.npy", "_objects.npy")))
+           
+   def __len__(self):
+       return sum(len(frames) for frames, _, _ in self.chunks)
+   
+   # yield (frame record, hits view, objects view) for every frame in order, without copying
+   def frames(self):
+       for frames, hits, objects in self.chunks:
+           for frame in frames:
+               h = frame['hit_start']
+               o = frame['object_start']
+               yield (frame, hits[h:h + frame['hit_count']],
+                      objects[o:o + frame['object_count']])
+
+# feed a recorded log through feature extraction and the feature/track update as fast as possible
+def replay(directory, env=None):
+   if env is None:
+       from env import Environment
+       env = Environment(headless=True)
+   reader = ScanLogReader(directory)
+   now = [0.0]
+   env.clock = lambda: now[0]
+   
+   start = time.perf_counter()
+   for frame, hits, _ in reader.frames():
+       now[0] = frame['time_ms']
+       env.robot.x, env.robot.y = frame['robot_x'], frame['robot_y']
+       env.main_object.x, env.main_object.y = frame['main_x'], frame['main_y']
+       features = env.robot.sensor.extract_features(hits)
+       env.update_features(features, hits)
+   return env, len(reader), time.perf_counter() - start
+
+def main():
+   parser = argparse.ArgumentParser(description="Replay a recorded scan log through the SLAM/DATMO backend")
+   parser.add_argument("directory")
+   args = parser.parse_args()
+   env, frames, seconds = replay(args.directory)
+   print(f"replayed {frames} frames in {seconds:.2f} s ({frames / max(seconds, 1e-9):.0f} frames/s): "
+         f"{len(env.features)} features, {len(env.dynamic_objects)} tracks")
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,11 @@
+import numpy as np
+
+# define constants
+HOLD_STEPS = 10 # steps each scripted main object command is held for
+MOVES = [(5, 0), (-5, 0), (0, 5), (0, -5), (0, 0)] # scripted main object commands
+
+# seeded random walk for the main object, one (dx, dy) per step
+def scripted_commands(seed, steps, hold=HOLD_STEPS):
+   rng = np.random.default_rng(seed)
+   picks = np.repeat(rng.integers(0, len(MOVES), steps // hold + 1), hold)[:steps]
+   return [MOVES[i] for i in picks]
\ No newline at end of file
@@ -0,0 +1,49 @@
+import numpy as np
+
+# define constants
+MAIN_OBJECT_SIZE = 5 # half-size of main object marker
+MOVING_OBJECT_RADIUS = 10 # radius of moving objects
+
+# whether pixels at offsets (dx, dy) from a moving object's centre pixel fall in its disc
+def in_disc(dx, dy):
+   return dx**2 + dy**2 <= MOVING_OBJECT_RADIUS**2
+
+# whether pixels at offsets (dx, dy) from the main object's centre pixel fall on its cross
+def in_cross(dx, dy):
+   s = MAIN_OBJECT_SIZE
+   return (np.abs(dx) <= s) & (np.abs(dy) <= s) & ((np.abs(dx - dy) <= 1) | (np.abs(dx + dy) <= 1))
+
+# pixel offsets covered by a moving object disc
+DISC_OFFSETS = np.array([(dx, dy)
+                         for dx in range(-MOVING_OBJECT_RADIUS, MOVING_OBJECT_RADIUS + 1)
+                         for dy in range(-MOVING_OBJECT_RADIUS, MOVING_OBJECT_RADIUS + 1)
+                         if in_disc(dx, dy)])
+
+# walls plus moving objects (discs) and the main object (a cross) around a point, as (grid, x0, y0)
+# with grid a boolean array indexed [x - x0, y - y0]
+def occupancy_window(wall_mask, x, y, radius, object_x, object_y, main_x, main_y):
+   width, height = wall_mask.shape
+   x0 = min(max(int(x) - radius - 1, 0), width - 1)
+   y0 = min(max(int(y) - radius - 1, 0), height - 1)
+   x1 = max(min(int(x) + radius + 2, width), x0 + 1)
+   y1 = max(min(int(y) + radius + 2, height), y0 + 1)
+   
+   # static walls
+   grid = wall_mask[x0:x1, y0:y1].copy()
+   gx = np.arange(x0, x1)[:, None]
+   gy = np.arange(y0, y1)[None, :]
+   
+   # moving objects as discs, stamped together from precomputed pixel offsets
+   r = MOVING_OBJECT_RADIUS
+   ox = np.asarray(object_x).astype(np.intp)
+   oy = np.asarray(object_y).astype(np.intp)
+   near = (ox + r >= x0) & (ox - r < x1) & (oy + r >= y0) & (oy - r < y1)
+   if near.any():
+       px = (ox[near, None] + DISC_OFFSETS[:, 0]).ravel() - x0
+       py = (oy[near, None] + DISC_OFFSETS[:, 1]).ravel() - y0
+       inside = (px >= 0) & (px < x1 - x0) & (py >= 0) & (py < y1 - y0)
+       grid[px[inside], py[inside]] = True
+   
+   # main object as a cross
+   grid |= in_cross(gx - int(main_x), gy - int(main_y))
+   return grid, x0, y0
\ No newline at end of file
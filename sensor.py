@@ -1,77 +1,83 @@
 import numpy as np
+from scan_cache import ScanCache
 
 # define constants
 NOISE_STD_MEAS = 0.01 # standard deviation of measurement error
 MAX_RANGE = 100 # maximum range of sensor
 DISTANCE_THRESHOLD = 5 # threshold for distance
 MIN_CLUSTER_SIZE = 3 # minimum points for feature
+NUM_RAYS = 720 # number of rays per scan
+RAY_BLOCK = 16 # ray steps marched per batch
+MEASUREMENT_COLUMNS = 4 # angle, dist, x, y
+
+# march rays from their own origins, returning the first colliding step of each (-1 when nothing is in range)
+# all rays move together one block of steps at a time and are dropped once they hit; leaving the map counts
+# as a collision, and occupied(active, ray_x, ray_y) reports what else the still-active rays' steps hit
+def march_rays(origin_x, origin_y, cos, sin, max_range, width, height, occupied):
+   hit_step = np.full(len(origin_x), -1)
+   active = np.arange(len(origin_x))
+   for start in range(1, max_range + 1, RAY_BLOCK):
+       steps = np.arange(start, min(start + RAY_BLOCK, max_range + 1))
+       ray_x = np.trunc(origin_x[active, None] + np.outer(cos[active], steps)).astype(np.intp)
+       ray_y = np.trunc(origin_y[active, None] + np.outer(sin[active], steps)).astype(np.intp)
+       
+       # out of bounds counts as a collision
+       hit = (ray_x < 0) | (ray_x >= width) | (ray_y < 0) | (ray_y >= height)
+       hit |= occupied(active, ray_x, ray_y)
+       
+       # first colliding step of each ray in this block
+       has_hit = hit.any(axis=1)
+       hit_step[active[has_hit]] = steps[hit[has_hit].argmax(axis=1)]
+       active = active[~has_hit]
+       if len(active) == 0:
+           break
+           
+   return hit_step
 
 # Class to define tof sensor
 class Sensor:
-   def __init__(self, max_range=MAX_RANGE, noise_std=NOISE_STD_MEAS):
+   def __init__(self, max_range=MAX_RANGE, noise_std=NOISE_STD_MEAS, num_rays=NUM_RAYS, rng=None,
+                use_cache=True):
        self.max_range = max_range
        self.noise_std = noise_std
+       self.rng = np.random.default_rng() if rng is None else rng
+       self.angles = np.linspace(0, 2*np.pi, num_rays)
+       self.cos = np.cos(self.angles)
+       self.sin = np.sin(self.angles)
+       self.cache = ScanCache() if use_cache else None
+       self.rays_cast = 0  # rays actually cast by the last scan
+       self.hit_steps = np.full(num_rays, -1)  # first hit step of every ray in the last scan
        
-   # scan the environment
-   def scan(self, robot_x, robot_y, env):
-       measurements = []
-       angles = np.linspace(0, 2*np.pi, 720)
+   # cast the given rays, returning the first colliding step of each (-1 when nothing is in range)
+   def cast(self, robot_x, robot_y, env, rays):
+       # occupancy window around the robot, indexed [x - x0, y - y0]
+       grid, x0, y0 = env.sensor_window(robot_x, robot_y, self.max_range)
        
-       for angle in angles:
-           ray_x = robot_x
-           ray_y = robot_y
-           
-           for r in range(self.max_range):
-               ray_x += np.cos(angle)
-               ray_y += np.sin(angle)
-               
-               # Check collision
-               if env.is_collision_sensor(ray_x, ray_y):
-                   dist = np.sqrt((ray_x - robot_x)**2 + (ray_y - robot_y)**2)
-                   # Add noise to simulate sensor error
-                   dist += np.random.normal(0, self.noise_std)
-                   measurements.append((angle, dist, ray_x, ray_y))
-                   break
-                   
-       return measurements
+       def occupied(active, ray_x, ray_y):
+           return grid[np.clip(ray_x - x0, 0, grid.shape[0] - 1), np.clip(ray_y - y0, 0, grid.shape[1] - 1)]
+       
+       return march_rays(np.full(len(rays), robot_x, dtype=float), np.full(len(rays), robot_y, dtype=float),
+                         self.cos[rays], self.sin[rays], self.max_range, env.width, env.height, occupied)
    
    # extract features from measurements
    def extract_features(self, measurements, threshold=DISTANCE_THRESHOLD):
-       features = []
-       clusters = []
-       current_cluster = []
+       if len(measurements) == 0:
+           return []
+       points = np.asarray(measurements, dtype=float)[:, 2:4]
        
-       # Simple clustering based on distance between consecutive measurements       
-       for i in range(len(measurements)):
-           if len(current_cluster) == 0:
-               current_cluster.append(measurements[i])
-           else:
-               prev_x = measurements[i-1][2]
-               prev_y = measurements[i-1][3]
-               curr_x = measurements[i][2]
-               curr_y = measurements[i][3]
-               
-               dist = np.sqrt((curr_x - prev_x)**2 + (curr_y - prev_y)**2)
-               
-               if dist < threshold:  # distance threshold
-                   current_cluster.append(measurements[i])
-               else:
-                   if len(current_cluster) > MIN_CLUSTER_SIZE:  # min points for feature
-                       clusters.append(current_cluster)
-                   current_cluster = [measurements[i]]
-                    
-       # catch last cluster
-       if len(current_cluster) > MIN_CLUSTER_SIZE:
-           clusters.append(current_cluster)
-            
+       # Simple clustering based on distance between consecutive measurements
+       gaps = np.sqrt((np.diff(points, axis=0)**2).sum(axis=1))
+       starts = np.concatenate(([0], np.nonzero(gaps >= threshold)[0] + 1))
+       sizes = np.diff(np.append(starts, len(points)))
+       sums = np.add.reduceat(points, starts, axis=0)
        
-       # Process clusters to extract features
-       # Calculate centroid of cluster
-       for cluster in clusters:
-           x_coords = [m[2] for m in cluster]
-           y_coords = [m[3] for m in cluster]
-           feature_x = np.mean(x_coords)
-           feature_y = np.mean(y_coords)
-           features.append((feature_x, feature_y))
-           
-       return features
\ No newline at end of file
+       # the scan is circular: join the clusters either side of the 0/2pi seam
+       if len(starts) > 1 and np.sqrt(((points[-1] - points[0])**2).sum()) < threshold:
+           sums[-1] += sums[0]
+           sizes[-1] += sizes[0]
+           sums, sizes = sums[1:], sizes[1:]
+       
+       # Calculate centroid of each cluster with enough points
+       keep = sizes > MIN_CLUSTER_SIZE
+       centroids = sums[keep] / sizes[keep, None]
+       return [tuple(c) for c in centroids.tolist()]
\ No newline at end of file
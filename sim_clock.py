@@ -0,0 +1,42 @@
+import time
+
+# define constants
+DT_MS = 33 # simulated milliseconds per step (about 30 Hz)
+MAX_LAG_STEPS = 3 # steps real-time pacing may fall behind before it stops trying to catch up
+
+# Class to define a fixed-timestep simulation clock
+# simulated time only moves when the clock is stepped, so results do not depend on host speed;
+# with realtime pacing each step also waits until its wall-clock due time
+class SimClock:
+   def __init__(self, dt_ms=DT_MS, realtime=False):
+       self.dt_ms = dt_ms
+       self.realtime = realtime
+       self.steps = 0
+       self.wall_start = None  # perf_counter time of step 0 when pacing
+       
+   # simulated time in milliseconds
+   def now(self):
+       return self.steps * self.dt_ms
+   
+   # the clock is also a callable returning milliseconds, like the time sources it replaces
+   def __call__(self):
+       return self.now()
+   
+   # advance n steps, pacing against the wall clock if enabled
+   def step(self, n=1):
+       self.steps += n
+       if not self.realtime:
+           return
+       now = time.perf_counter()
+       if self.wall_start is None:
+           self.wall_start = now - self.now() / 1000.0
+       wait = self.wall_start + self.now() / 1000.0 - now
+       if wait > 0:
+           time.sleep(wait)
+       elif -wait > MAX_LAG_STEPS * self.dt_ms / 1000.0:
+           # too far behind (e.g. a stall): resume pacing from here instead of rushing
+           self.wall_start = now - self.now() / 1000.0
+           
+   # number of steps still needed to reach t_ms
+   def steps_until(self, t_ms):
+       return max(-(-(t_ms - self.now()) // self.dt_ms), 0)
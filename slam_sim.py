@@ -1,5 +1,10 @@
+import argparse
 import pygame
 from env import Environment
+from pipeline import PipelinedRunner
+from scan_log import ScanLogWriter
+from sim_clock import SimClock
+from map_snapshot import Checkpointer
 import numpy as np
 
 def draw_feature_map(env):
@@ -26,6 +31,7 @@ def draw_feature_map(env):
     
     # Save the feature map
     pygame.image.save(feature_map, "feature_map.png")
+    env.occupancy.save("occupancy_grid")
     
     # Display the feature map in a new window
     pygame.display.set_caption("Feature Map")
@@ -40,23 +46,90 @@ def draw_feature_map(env):
             if event.type == pygame.QUIT:
                 waiting = False
                 
-def main():
-    env = Environment()
-    clock = pygame.time.Clock()
-    running = True
+def main(pipelined=False, record=None, robots=1, load=None, checkpoint=None, scan_workers=0):
+    # fixed 33 ms steps, paced to real time; the worker thread paces itself when pipelined
+    env = Environment(num_robots=robots, clock=SimClock(realtime=True), map_snapshot=load,
+                      scan_workers=scan_workers)
+    runner = checkpointer = log = None
+    try:
+        running = True
+        
+        # optional periodic map snapshots, written in the background, plus a final one on exit
+        checkpointer = Checkpointer(env, checkpoint) if checkpoint else None
+        
+        # sensing and estimation on a worker thread, rendering the last completed frame here
+        if pipelined:
+            runner = PipelinedRunner(env, on_frame=checkpointer.maybe_checkpoint if checkpointer else None)
+            runner.start()
+        
+        # optional log of every frame's scan and ground truth for offline replay
+        log = ScanLogWriter(record) if record else None
+        
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                # F3 toggles frame-time telemetry and its overlay
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    env.telemetry.enabled = not env.telemetry.enabled
+                    env.renderer.show_telemetry = env.telemetry.enabled
+                    
+            if runner:
+                runner.submit(env.read_keys())
+                snapshot = runner.take(timeout=1.0)
+                if snapshot:
+                    env.renderer.draw(snapshot.measurements, snapshot)
+                    runner.presented(snapshot)
+            else:
+                measurements = env.step()
+                if log:
+                    log.record_env(env, measurements)
+                if checkpointer:
+                    checkpointer.maybe_checkpoint()
+                env.draw(measurements)   
+        
+    finally:
+        # even if the loop fails: stop the worker thread first so nothing steps the environment any more,
+        # flush the buffered scan log frames, write the final snapshot, then stop the speech and scan workers
+        if runner:
+            runner.stop()
+        if log:
+            log.close()
+        if checkpointer:
+            checkpointer.close()
+        env.close()
     
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                
-        measurements = env.update()
-        env.draw(measurements)   
-        clock.tick(30)
+    if runner:
+        latency = runner.latency_percentiles()
+        print(f"Sensor-to-display latency: p50 {latency[50]:.1f} ms, "
+              f"p95 {latency[95]:.1f} ms, p99 {latency[99]:.1f} ms")
+    
+    # Save recorded frame telemetry
+    if env.telemetry.frames:
+        env.telemetry.export_csv("frame_telemetry.csv")
+        env.telemetry.export_chrome_trace("frame_trace.json")
     
     # After main simulation ends, show feature map
     draw_feature_map(env)
     pygame.quit()
 
 if __name__ == "__main__":
-   main()
\ No newline at end of file
+   parser = argparse.ArgumentParser(description="SLAM with DATMO simulation")
+   parser.add_argument("--pipelined", action="store_true",
+                       help="run sensing and estimation on a worker thread, pipelined with rendering")
+   parser.add_argument("--record", metavar="DIR",
+                       help="record scans and ground truth to a scan log for offline replay")
+   parser.add_argument("--robots", type=int, default=1,
+                       help="number of robots mapping together (escorts hold stations around the main object)")
+   parser.add_argument("--load", metavar="SNAPSHOT",
+                       help="start from a saved map snapshot instead of an empty map")
+   parser.add_argument("--checkpoint", metavar="SNAPSHOT",
+                       help="save map snapshots here periodically and on exit")
+   parser.add_argument("--scan-workers", type=int, default=0, metavar="N",
+                       help="cast sensor rays on N worker processes sharing the map")
+   args = parser.parse_args()
+   if args.pipelined and args.record:
+       parser.error("--record is only supported without --pipelined")
+   if args.record and args.robots > 1:
+       parser.error("--record is only supported with a single robot")
+   main(args.pipelined, args.record, args.robots, args.load, args.checkpoint, args.scan_workers)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import math
+
+# Class to define a uniform-grid spatial hash over point ids
+class SpatialHash:
+   def __init__(self, cell_size):
+       self.cell_size = cell_size
+       self.cells = {}  # {(cx, cy): set of ids}
+       self.positions = {}  # {id: (x, y)}
+       
+   def cell(self, x, y):
+       return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+   
+   def insert(self, item_id, x, y):
+       self.cells.setdefault(self.cell(x, y), set()).add(item_id)
+       self.positions[item_id] = (x, y)
+       
+   def remove(self, item_id):
+       x, y = self.positions.pop(item_id)
+       key = self.cell(x, y)
+       self.cells[key].discard(item_id)
+       if not self.cells[key]:
+           del self.cells[key]
+           
+   # update position, moving the id between cells only when it changes cell
+   def move(self, item_id, x, y):
+       old = self.cell(*self.positions[item_id])
+       new = self.cell(x, y)
+       if old != new:
+           self.remove(item_id)
+           self.insert(item_id, x, y)
+       else:
+           self.positions[item_id] = (x, y)
+           
+   # ids within radius of a point, in ascending id order
+   def query(self, x, y, radius):
+       cx0, cy0 = self.cell(x - radius, y - radius)
+       cx1, cy1 = self.cell(x + radius, y + radius)
+       # for large radii it is cheaper to visit the occupied cells than the covered ones
+       if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+           keys = [key for key in self.cells
+                   if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1]
+       else:
+           keys = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+           
+       found = []
+       for key in keys:
+           for item_id in self.cells.get(key, ()):
+               px, py = self.positions[item_id]
+               if (px - x)**2 + (py - y)**2 <= radius**2:
+                   found.append(item_id)
+       found.sort()
+       return found
+   
+   def __len__(self):
+       return len(self.positions)
@@ -0,0 +1,76 @@
+import numpy as np
+from movingObjects import VELOCITY, MAX_HISTORY
+
+# Class to define a read-only view of one object in a Swarm, shaped like a MovingObject
+class SwarmMember:
+   def __init__(self, swarm, index):
+       self.swarm = swarm
+       self.index = index
+       
+   @property
+   def x(self):
+       return self.swarm.x[self.index]
+   
+   @property
+   def y(self):
+       return self.swarm.y[self.index]
+   
+   @property
+   def theta(self):
+       return self.swarm.theta[self.index]
+   
+   # trajectory, oldest first
+   @property
+   def history(self):
+       return [tuple(p) for p in self.swarm.trajectory(self.index).tolist()]
+
+# Class to define many moving objects as arrays, advanced together
+class Swarm:
+   def __init__(self, count, width, height, rng, velocity=VELOCITY, max_history=MAX_HISTORY):
+       self.rng = rng
+       self.x = rng.integers(0, width, count).astype(float)
+       self.y = rng.integers(0, height, count).astype(float)
+       self.theta = rng.uniform(0, 2*np.pi, count)
+       self.velocity = np.full(count, float(velocity))
+       
+       # fixed-size trajectory ring buffers: next write slot and number of valid entries per object
+       self.history = np.zeros((count, max_history, 2))
+       self.history[:, 0, 0] = self.x
+       self.history[:, 0, 1] = self.y
+       self.history_head = np.ones(count, dtype=np.intp) % max_history
+       self.history_len = np.ones(count, dtype=np.intp)
+       
+   # advance every object one step; objects whose move collides stay put and pick a new heading
+   def step(self, collision_field):
+       new_x = self.x + self.velocity * np.cos(self.theta)
+       new_y = self.y + self.velocity * np.sin(self.theta)
+       
+       # Collision detection with walls, all objects at once
+       blocked = collision_field.blocked_many(new_x, new_y)
+       self.theta[blocked] = self.rng.uniform(0, 2*np.pi, np.count_nonzero(blocked))
+       
+       moved = np.nonzero(~blocked)[0]
+       self.x[moved] = new_x[moved]
+       self.y[moved] = new_y[moved]
+       
+       head = self.history_head[moved]
+       self.history[moved, head, 0] = self.x[moved]
+       self.history[moved, head, 1] = self.y[moved]
+       self.history_head[moved] = (head + 1) % self.history.shape[1]
+       self.history_len[moved] = np.minimum(self.history_len[moved] + 1, self.history.shape[1])
+       
+   # trajectory of one object, oldest first, as an (n, 2) array
+   def trajectory(self, index):
+       length = self.history_len[index]
+       slots = (self.history_head[index] - length + np.arange(length)) % self.history.shape[1]
+       return self.history[index, slots]
+   
+   # positions of all objects as an (n, 2) array
+   def positions(self):
+       return np.column_stack((self.x, self.y))
+   
+   def __len__(self):
+       return len(self.x)
+   
+   def __iter__(self):
+       return (SwarmMember(self, i) for i in range(len(self.x)))
@@ -0,0 +1,139 @@
+import csv
+import json
+import time
+import numpy as np
+
+# define constants
+FRAME_CAPACITY = 1024 # frames kept in the ring buffer
+PERCENTILES = (50, 95, 99) # reported frame latency percentiles
+
+# Class to define a no-op stage timer, shared while telemetry is disabled
+class NullStage:
+   def __enter__(self):
+       return self
+   
+   def __exit__(self, *exc):
+       return False
+
+NULL_STAGE = NullStage()
+
+# Class to define a stage timer writing into the current ring buffer slot
+class StageTimer:
+   def __init__(self, telemetry, name):
+       self.telemetry = telemetry
+       self.name = name
+       
+   def __enter__(self):
+       self.start = time.perf_counter()
+       return self
+   
+   def __exit__(self, *exc):
+       t = self.telemetry
+       slot = t.slot
+       if self.name not in t.stage_ms:
+           t.stage_ms[self.name] = np.zeros(t.capacity)
+           t.stage_start[self.name] = np.zeros(t.capacity)
+       # a stage run several times in one frame keeps its first start and total time
+       if t.stage_ms[self.name][slot] == 0:
+           t.stage_start[self.name][slot] = self.start - t.origin
+       t.stage_ms[self.name][slot] += (time.perf_counter() - self.start) * 1000.0
+       return False
+
+# Class to define per-frame stage timings and counters kept in a ring buffer
+class Telemetry:
+   def __init__(self, enabled=False, capacity=FRAME_CAPACITY):
+       self.enabled = enabled
+       self.capacity = capacity
+       self.origin = time.perf_counter()
+       self.frames = 0  # frames recorded since creation
+       self.slot = 0
+       self.frame_start = np.zeros(capacity)
+       self.frame_ms = np.zeros(capacity)
+       self.stage_ms = {}  # {stage: ms per slot}
+       self.stage_start = {}  # {stage: start time per slot, seconds since origin}
+       self.counts = {}  # {counter: value per slot}
+       self.start = 0.0
+       
+   # start a new frame in the next ring buffer slot
+   def begin_frame(self):
+       if not self.enabled:
+           return
+       self.slot = self.frames % self.capacity
+       self.frames += 1
+       for values in self.stage_ms.values():
+           values[self.slot] = 0
+       for values in self.counts.values():
+           values[self.slot] = 0
+       self.start = time.perf_counter()
+       self.frame_start[self.slot] = self.start - self.origin
+       self.frame_ms[self.slot] = 0
+       
+   # close the current frame; later calls in the same frame extend it (e.g. draw after update)
+   def end_frame(self):
+       if self.enabled and self.frames:
+           self.frame_ms[self.slot] = (time.perf_counter() - self.start) * 1000.0
+           
+   def stage(self, name):
+       if not self.enabled or not self.frames:
+           return NULL_STAGE
+       return StageTimer(self, name)
+   
+   def count(self, name, value):
+       if not self.enabled or not self.frames:
+           return
+       if name not in self.counts:
+           self.counts[name] = np.zeros(self.capacity, dtype=np.int64)
+       self.counts[name][self.slot] += value
+       
+   # ring buffer slots of recorded frames, oldest first
+   def recorded_slots(self):
+       if self.frames <= self.capacity:
+           return np.arange(self.frames)
+       return (np.arange(self.capacity) + self.frames) % self.capacity
+   
+   # frame latency percentiles over the ring buffer, {50: ms, 95: ms, 99: ms}
+   def percentiles(self):
+       slots = self.recorded_slots()
+       if len(slots) == 0:
+           return {p: 0.0 for p in PERCENTILES}
+       values = np.percentile(self.frame_ms[slots], PERCENTILES)
+       return dict(zip(PERCENTILES, values.tolist()))
+   
+   # stage timings and counters of the most recent frame
+   def last_frame(self):
+       if not self.frames:
+           return {}, {}
+       slot = (self.frames - 1) % self.capacity
+       return ({name: float(values[slot]) for name, values in self.stage_ms.items()},
+               {name: int(values[slot]) for name, values in self.counts.items()})
+   
+   # one row per frame: frame number, frame time, stage times and counters
+   def export_csv(self, path):
+       stages = sorted(self.stage_ms)
+       counters = sorted(self.counts)
+       first = self.frames - len(self.recorded_slots())
+       with open(path, "w", newline="") as f:
+           writer = csv.writer(f)
+           writer.writerow(['frame', 'frame_ms'] + [f"{s}_ms" for s in stages] + counters)
+           for i, slot in enumerate(self.recorded_slots()):
+               writer.writerow([first + i, self.frame_ms[slot]] +
+                               [self.stage_ms[s][slot] for s in stages] +
+                               [self.counts[c][slot] for c in counters])
+               
+   # complete events in the Chrome trace format (chrome://tracing, Perfetto)
+   def export_chrome_trace(self, path):
+       events = []
+       for slot in self.recorded_slots():
+           events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                          'ts': self.frame_start[slot] * 1e6, 'dur': self.frame_ms[slot] * 1e3})
+           for name, values in self.stage_ms.items():
+               if values[slot] > 0:
+                   events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 1,
+                                  'ts': self.stage_start[name][slot] * 1e6,
+                                  'dur': values[slot] * 1e3})
+           for name, values in self.counts.items():
+               events.append({'name': name, 'ph': 'C', 'pid': 0, 'tid': 0,
+                              'ts': self.frame_start[slot] * 1e6,
+                              'args': {name: int(values[slot])}})
+       with open(path, "w") as f:
+           json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
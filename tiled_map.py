@@ -0,0 +1,144 @@
+import argparse
+import json
+import mmap
+import os
+from collections import OrderedDict
+import numpy as np
+import pygame
+
+# define constants
+TILE_SIZE = 256 # pixels per tile side
+MAX_TILES = 64 # tiles kept in memory, least recently used evicted first
+BLACK = (0, 0, 0) # wall colour in floor plan images
+
+# sidecar file holding the map size and tile size of a tiled map
+def meta_path(path):
+   return os.path.splitext(path)[0] + ".json"
+
+# Class to define a large boolean map read lazily, one fixed-size tile at a time, from a memory-mapped .npy file
+# the file stores tiles contiguously, as (tiles across, tiles down, tile_size, tile_size), so a tile is one read;
+# indexed [x, y] like the in-memory masks: a pair of slices returns a window array, a pair of
+# ints or int arrays returns the cells at those points
+class TiledMap:
+   def __init__(self, path, max_tiles=MAX_TILES):
+       with open(meta_path(path)) as f:
+           meta = json.load(f)
+       # the tile array, read through our own read-only mapping of the file so its pages can be dropped
+       with open(path, 'rb') as f:
+           version = np.lib.format.read_magic(f)
+           read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                          else np.lib.format.read_array_header_2_0)
+           shape, fortran_order, dtype = read_header(f)
+           self.file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+           self.offset = f.tell()
+           self.cells = np.ndarray(shape, dtype=dtype, buffer=self.file_map, offset=self.offset,
+                                   order='F' if fortran_order else 'C')
+       self.init_tiles((meta['width'], meta['height']), meta['tile_size'], max_tiles)
+       
+   def init_tiles(self, shape, tile_size, max_tiles):
+       self.shape = shape
+       self.width, self.height = shape
+       self.tile_size = tile_size
+       self.max_tiles = max_tiles
+       self.tiles = OrderedDict()  # {(tx, ty): array}, most recently used last
+       self.loads = 0
+       self.evictions = 0
+       
+   # read one tile into memory, then unmap its file pages again so only the cached tiles stay resident
+   def load_tile(self, tx, ty):
+       tile = np.array(self.cells[tx, ty])
+       # not every platform can drop mapped pages (Windows has no madvise)
+       if hasattr(mmap, "MADV_DONTNEED"):
+           start = self.offset + tx * self.cells.strides[0] + ty * self.cells.strides[1]
+           page = start - start % mmap.PAGESIZE
+           self.file_map.madvise(mmap.MADV_DONTNEED, page, start + tile.nbytes - page)
+       return tile
+   
+   def tile(self, tx, ty):
+       key = (tx, ty)
+       tile = self.tiles.get(key)
+       if tile is None:
+           tile = self.load_tile(tx, ty)
+           self.loads += 1
+           self.tiles[key] = tile
+           if len(self.tiles) > self.max_tiles:
+               self.tiles.popitem(last=False)
+               self.evictions += 1
+       else:
+           self.tiles.move_to_end(key)
+       return tile
+   
+   # cells of the window [x0, x1) x [y0, y1), which must lie inside the map
+   def window(self, x0, y0, x1, y1):
+       t = self.tile_size
+       out = None
+       for tx in range(x0 // t, (x1 - 1) // t + 1):
+           for ty in range(y0 // t, (y1 - 1) // t + 1):
+               tile = self.tile(tx, ty)
+               if out is None:
+                   out = np.zeros((x1 - x0, y1 - y0), dtype=tile.dtype)
+               ax0, ay0 = max(x0, tx*t), max(y0, ty*t)
+               ax1, ay1 = min(x1, (tx + 1)*t), min(y1, (ty + 1)*t)
+               out[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = tile[ax0 - tx*t:ax1 - tx*t, ay0 - ty*t:ay1 - ty*t]
+       return out
+   
+   # cells at many points, gathered tile by tile
+   def lookup(self, xs, ys):
+       xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp))
+       t = self.tile_size
+       tiles_down = -(-self.height // t)
+       keys = (xs // t) * tiles_down + ys // t
+       out = None
+       for key in np.unique(keys):
+           sel = keys == key
+           tile = self.tile(*divmod(int(key), tiles_down))
+           if out is None:
+               out = np.zeros(xs.shape, dtype=tile.dtype)
+           out[sel] = tile[xs[sel] % t, ys[sel] % t]
+       return np.zeros(xs.shape, dtype=bool) if out is None else out
+   
+   def __getitem__(self, key):
+       kx, ky = key
+       if isinstance(kx, slice):
+           x0, x1, _ = kx.indices(self.width)
+           y0, y1, _ = ky.indices(self.height)
+           return self.window(x0, y0, x1, y1)
+       if np.ndim(kx) == 0 and np.ndim(ky) == 0:
+           return self.lookup(kx, ky)[()]
+       return self.lookup(kx, ky)
+
+# write a tiled map file from a floor plan image, scaled and repeated nx by ny times
+def build_tiled_map(image_path, path, size=(1200, 600), repeat=(1, 1), tile_size=TILE_SIZE):
+   floor_plan = pygame.transform.scale(pygame.image.load(image_path), size)
+   walls = np.all(pygame.surfarray.array3d(floor_plan) == BLACK, axis=-1)
+   width, height = size[0] * repeat[0], size[1] * repeat[1]
+   t = tile_size
+   cells = np.lib.format.open_memmap(path, mode='w+', dtype=bool,
+                                     shape=(-(-width // t), -(-height // t), t, t))
+   
+   # fill one column of tiles at a time; cells past the map edge stay empty
+   gy = np.arange(cells.shape[1] * t) % size[1]
+   for tx in range(cells.shape[0]):
+       gx = np.arange(tx*t, min((tx + 1)*t, width)) % size[0]
+       column = np.zeros((t, cells.shape[1] * t), dtype=bool)
+       column[:len(gx), :height] = walls[gx[:, None], gy[None, :height]]
+       cells[tx] = column.reshape(t, cells.shape[1], t).transpose(1, 0, 2)
+   cells.flush()
+   
+   with open(meta_path(path), "w") as f:
+       json.dump({'width': width, 'height': height, 'tile_size': t}, f)
+   return width, height
+
+def main():
+   parser = argparse.ArgumentParser(description="Build a tiled map file from a floor plan image")
+   parser.add_argument("image")
+   parser.add_argument("output")
+   parser.add_argument("--size", type=int, nargs=2, default=(1200, 600), metavar=("W", "H"),
+                       help="size the image is scaled to before repeating")
+   parser.add_argument("--repeat", type=int, nargs=2, default=(1, 1), metavar=("NX", "NY"),
+                       help="number of copies across and down")
+   args = parser.parse_args()
+   print("map size:", build_tiled_map(args.image, args.output, tuple(args.size), tuple(args.repeat)))
+
+if __name__ == "__main__":
+   main()
@@ -1,35 +1,113 @@
-import pyttsx3
 import threading
 import time
 
+# define constants
+SPEECH_RATE = 150 # words per minute
+SPEECH_VOLUME = 0.9 # 0.0 to 1.0
+SPEAK_BUFFER = 5 # seconds between the starts of two utterances
+MAX_PENDING_AGE = 0.1 # seconds a closer pending warning may hold off newer, farther ones
+
+# Backend that speaks through pyttsx3, created on the speech worker thread the first time it is used
+class Pyttsx3Backend:
+    def __init__(self, rate=SPEECH_RATE, volume=SPEECH_VOLUME):
+        self.rate = rate
+        self.volume = volume
+        self.engine = None
+        
+    def say(self, text):
+        if self.engine is None:
+            import pyttsx3
+            self.engine = pyttsx3.init()
+            self.engine.setProperty('rate', self.rate)      # Speed of speech
+            self.engine.setProperty('volume', self.volume)  # Volume (0.0 to 1.0)
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+# Backend that drops every utterance, for headless runs
+class NullBackend:
+    def say(self, text):
+        pass
+
+# Class to define a speech system with one long-lived worker thread
+# warnings wait in a single pending slot: a newer warning replaces the pending one unless that one
+# is about a closer obstacle and still fresh, so what is spoken is never much older than the latest
+# warning; the frame loop only ever takes a lock and never waits on speech
 class TTSSystem:
-    def __init__(self):
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 150)    # Speed of speech
-        self.engine.setProperty('volume', 0.9)  # Volume (0.0 to 1.0)
+    def __init__(self, backend=None, speak_buffer=SPEAK_BUFFER, echo=False, max_pending_age=MAX_PENDING_AGE):
+        self.backend = Pyttsx3Backend() if backend is None else backend
+        self.speak_buffer = speak_buffer
+        self.max_pending_age = max_pending_age
+        self.echo = echo  # also print each spoken warning to the console
         self.last_warning = None
-        self.is_speaking = False
-        self.last_speak_time = 0
-        self.speak_buffer = 5  # 5 second buffer between speeches
-        
-    def speak(self, text):
-        current_time = time.time()
+        self.pending = None  # (distance, text, queued time) waiting to be spoken
+        self.condition = threading.Condition()
+        self.worker = None
+        self.running = False
+        self.spoken = 0
+        self.coalesced = 0  # warnings replaced or dropped before being spoken
         
-        # Don't repeat the same warning or speak if not enough time has passed
-        if (text == self.last_warning or 
-            current_time - self.last_speak_time < self.speak_buffer):
+    # queue a warning, distance ranks it against a fresh pending one (closer wins, newest wins ties)
+    def speak(self, text, distance=float('inf')):
+        # nothing to say or print: headless runs never start a worker, so they need no close()
+        if isinstance(self.backend, NullBackend) and not self.echo:
             return
+        now = time.monotonic()
+        with self.condition:
+            if self.pending is not None:
+                self.coalesced += 1
+                pending_distance, _, queued = self.pending
+                if pending_distance < distance and now - queued <= self.max_pending_age:
+                    return
+            self.pending = (distance, text, now)
+            if self.worker is None:
+                self.running = True
+                self.worker = threading.Thread(target=self.work, daemon=True)
+                self.worker.start()
+            self.condition.notify()
             
-        self.last_warning = text
-        self.last_speak_time = current_time
-        
-        # Run speech in a separate thread to avoid blocking the game
-        def speak_thread():
-            self.is_speaking = True
-            self.engine.say(text)
-            self.engine.runAndWait()
-            self.is_speaking = False
+    def work(self):
+        last_speak_time = None
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                
+            # hold off until the buffer since the last utterance has passed, letting warnings coalesce
+            if last_speak_time is not None:
+                wait = self.speak_buffer - (time.monotonic() - last_speak_time)
+                if wait > 0:
+                    with self.condition:
+                        self.condition.wait_for(lambda: not self.running, wait)
+                        
+            with self.condition:
+                if not self.running:
+                    return
+                _, text, _ = self.pending
+                self.pending = None
+                
+            # Don't repeat the same warning
+            if text == self.last_warning:
+                continue
+            self.last_warning = text
+            last_speak_time = time.monotonic()
+            if self.echo:
+                print(text)
+            try:
+                self.backend.say(text)
+            except Exception as error:
+                # speech is best effort: without a working engine, keep going silently
+                print(f"Speech disabled: {error}")
+                self.backend = NullBackend()
+            self.spoken += 1
             
-        if not self.is_speaking:
-            thread = threading.Thread(target=speak_thread)
-            thread.start() 
\ No newline at end of file
+    # stop the worker, dropping any pending warning
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.pending = None
+            self.condition.notify()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
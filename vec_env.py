@@ -0,0 +1,260 @@
+import numpy as np
+import pygame
+from env import NUM_MOVING_OBJECTS, COLLISION_BUFFER, MAX_RANGE
+from scene import MAIN_OBJECT_SIZE, MOVING_OBJECT_RADIUS, in_disc, in_cross
+from movingObjects import VELOCITY
+from robot import ROBOT_VELOCITY, OBJ_ZONE
+from sensor import NOISE_STD_MEAS, DISTANCE_THRESHOLD, MIN_CLUSTER_SIZE, march_rays
+from collision import CollisionField, MARKER_RADIUS
+from scenario import MOVES, HOLD_STEPS
+from renderer import BLACK
+
+# define constants
+VEC_NUM_RAYS = 64 # rays per scan, coarse enough for policy observations
+COLLISION_PENALTY = 1.0 # reward lost when the robot's move is blocked
+
+# first colliding step of every ray of every world (-1 when nothing is in range), as a (K, rays) array
+# walls are looked up in the shared wall mask; moving objects (discs) and the main object (a cross)
+# are tested per world at the same integer pixels Environment.sensor_window stamps them on
+def cast_rays(walls, robot_x, robot_y, cos, sin, max_range, object_x, object_y, main_x, main_y):
+   width, height = walls.shape
+   num_worlds, num_rays = len(robot_x), len(cos)
+   owner = np.repeat(np.arange(num_worlds), num_rays)
+   ray = np.tile(np.arange(num_rays), num_worlds)
+   ox = object_x.astype(np.intp)
+   oy = object_y.astype(np.intp)
+   mx = main_x.astype(np.intp)
+   my = main_y.astype(np.intp)
+   
+   # only rays passing near an object need the per-pixel object tests
+   near_object = (passes_near(robot_x, robot_y, cos, sin, max_range, ox, oy, MOVING_OBJECT_RADIUS)
+                  .any(axis=2).ravel())
+   near_main = passes_near(robot_x, robot_y, cos, sin, max_range, mx[:, None], my[:, None],
+                           MAIN_OBJECT_SIZE * np.sqrt(2))[:, :, 0].ravel()
+   
+   def occupied(active, ray_x, ray_y):
+       w = owner[active]
+       hit = walls[np.clip(ray_x, 0, width - 1), np.clip(ray_y, 0, height - 1)]
+       
+       # moving objects as discs
+       b = np.flatnonzero(near_object[active])
+       if len(b):
+           dx = ray_x[b, :, None] - ox[w[b], None, :]
+           dy = ray_y[b, :, None] - oy[w[b], None, :]
+           hit[b] |= in_disc(dx, dy).any(axis=2)
+       
+       # main object as a cross
+       b = np.flatnonzero(near_main[active])
+       if len(b):
+           hit[b] |= in_cross(ray_x[b] - mx[w[b], None], ray_y[b] - my[w[b], None])
+       return hit
+   
+   hit_step = march_rays(robot_x[owner], robot_y[owner], cos[ray], sin[ray], max_range, width, height, occupied)
+   return hit_step.reshape(num_worlds, num_rays)
+
+# whether each ray of each world passes within radius (plus a pixel of rounding) of each of the
+# world's points, as a (K, rays, points) array
+def passes_near(robot_x, robot_y, cos, sin, max_range, px, py, radius):
+   rel_x = (px - robot_x[:, None])[:, None, :]
+   rel_y = (py - robot_y[:, None])[:, None, :]
+   along = np.clip(rel_x * cos[None, :, None] + rel_y * sin[None, :, None], 0, max_range)
+   off_x = rel_x - along * cos[None, :, None]
+   off_y = rel_y - along * sin[None, :, None]
+   return off_x**2 + off_y**2 <= (radius + 2)**2
+
+# clusters of every world's hits, as Sensor.extract_features finds them in each scan on its own
+# returns (centroids as an (n, 2) array, world index of each centroid)
+def extract_features(hit_x, hit_y, valid, threshold=DISTANCE_THRESHOLD):
+   world, ray = np.nonzero(valid)
+   if len(world) == 0:
+       return np.zeros((0, 2)), np.zeros(0, dtype=np.intp)
+   points = np.column_stack((hit_x[world, ray], hit_y[world, ray]))
+   
+   # a cluster starts with each world's first hit and wherever consecutive hits are far apart
+   first_hit = np.concatenate(([True], world[1:] != world[:-1]))
+   gaps = np.sqrt((np.diff(points, axis=0)**2).sum(axis=1))
+   starts = np.flatnonzero(first_hit | np.concatenate(([True], gaps >= threshold)))
+   sizes = np.diff(np.append(starts, len(points)))
+   sums = np.add.reduceat(points, starts, axis=0)
+   
+   # each scan is circular: join the clusters either side of its 0/2pi seam
+   first = np.flatnonzero(first_hit[starts])
+   last = np.append(first[1:] - 1, len(starts) - 1)
+   first_point = starts[first]
+   last_point = np.append(first_point[1:] - 1, len(points) - 1)
+   seam = np.sqrt(((points[last_point] - points[first_point])**2).sum(axis=1))
+   join = (last > first) & (seam < threshold)
+   sums[last[join]] += sums[first[join]]
+   sizes[last[join]] += sizes[first[join]]
+   
+   # Calculate centroid of each cluster with enough points
+   keep = sizes > MIN_CLUSTER_SIZE
+   keep[first[join]] = False
+   return sums[keep] / sizes[keep, None], world[starts[keep]]
+
+# Class to define K independent worlds on one floor plan, stepped together in lockstep
+# each world has a follower robot, a main object and its moving objects, held as stacked
+# (K,) and (K, M) arrays, and its own random generator; the robot's moves come from outside
+# (e.g. a policy), one (dx, dy) per world per step, capped at the robot's velocity
+class VecEnv:
+   def __init__(self, num_worlds, width=1200, height=600, seed=None, num_moving_objects=NUM_MOVING_OBJECTS,
+                sensor_range=MAX_RANGE, num_rays=VEC_NUM_RAYS, noise_std=NOISE_STD_MEAS):
+       self.num_worlds = num_worlds
+       self.width = width
+       self.height = height
+       self.max_range = sensor_range
+       self.noise_std = noise_std
+       self.angles = np.linspace(0, 2*np.pi, num_rays)
+       self.cos = np.cos(self.angles)
+       self.sin = np.sin(self.angles)
+       # one generator per world, so each world's run does not depend on how many run beside it
+       self.rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(num_worlds)]
+       
+       # static walls shared by every world
+       floor_plan = pygame.transform.scale(pygame.image.load("floor_plan.png"), (width, height))
+       self.wall_mask = np.all(pygame.surfarray.array3d(floor_plan) == BLACK[:3], axis=-1)
+       self.collision_buffer = COLLISION_BUFFER
+       self.collision_field = CollisionField(self.wall_mask, self.collision_buffer)
+       
+       # world state
+       self.robot_x = np.zeros(num_worlds)
+       self.robot_y = np.zeros(num_worlds)
+       self.main_x = np.zeros(num_worlds)
+       self.main_y = np.zeros(num_worlds)
+       self.object_x = np.zeros((num_worlds, num_moving_objects))
+       self.object_y = np.zeros((num_worlds, num_moving_objects))
+       self.object_theta = np.zeros((num_worlds, num_moving_objects))
+       self.commands = np.zeros((num_worlds, 2))  # main object (dx, dy), a seeded random walk per world
+       self.steps = np.zeros(num_worlds, dtype=np.intp)
+       
+       # last scan of every world: first hit steps, hit positions and the features found in them
+       self.hit_steps = np.full((num_worlds, num_rays), -1)
+       self.hit_x = np.zeros((num_worlds, num_rays))
+       self.hit_y = np.zeros((num_worlds, num_rays))
+       self.feature_xy = np.zeros((0, 2))
+       self.feature_world = np.zeros(0, dtype=np.intp)
+       
+       # reused output arrays, overwritten by the next step: scan ranges / max range, then the
+       # main object's offset from the robot / max range; and rewards
+       self.observations = np.zeros((num_worlds, num_rays + 2))
+       self.rewards = np.zeros(num_worlds)
+       self.blocked = np.zeros(num_worlds, dtype=bool)
+       
+       self.reset()
+   
+   # put the given worlds (all by default) back at their start, with fresh moving objects
+   # only those worlds are rescanned and draw from their generators, so the others run on unchanged
+   # returns the observations of every world
+   def reset(self, worlds=None):
+       worlds = np.arange(self.num_worlds) if worlds is None else np.asarray(worlds, dtype=np.intp)
+       count = self.object_x.shape[1]
+       for k in worlds:
+           rng = self.rngs[k]
+           self.robot_x[k], self.robot_y[k] = self.width//4 + 5, self.height//4 + 5
+           self.main_x[k], self.main_y[k] = self.width//4 + 50, self.height//4 + 50
+           self.object_x[k] = rng.integers(0, self.width, count)
+           self.object_y[k] = rng.integers(0, self.height, count)
+           self.object_theta[k] = rng.uniform(0, 2*np.pi, count)
+           self.steps[k] = 0
+           self.blocked[k] = False
+       self.scan(worlds)
+       self.observe(worlds)
+       return self.observations
+   
+   # advance every world one step: actions are the robots' (K, 2) moves; commands the main
+   # objects' moves, following each world's random walk if omitted
+   # returns (observations, rewards), both overwritten by the next step
+   def step(self, actions, commands=None):
+       if commands is None:
+           commands = self.random_walk()
+       self.move_objects(np.asarray(commands, dtype=float))
+       self.move_robots(np.asarray(actions, dtype=float))
+       self.scan()
+       self.steps += 1
+       self.observe()
+       return self.observations, self.rewards
+   
+   # the moves Robot.move would make: full speed towards the main object while outside its zone
+   def follow_actions(self):
+       dx, dy = self.main_x - self.robot_x, self.main_y - self.robot_y
+       theta = np.arctan2(dy, dx)
+       outside = np.sqrt(dx**2 + dy**2) > OBJ_ZONE
+       return np.column_stack((np.cos(theta), np.sin(theta))) * (ROBOT_VELOCITY * outside)[:, None]
+   
+   # next main object commands, each world holding a random move for HOLD_STEPS steps
+   def random_walk(self):
+       for k in np.flatnonzero(self.steps % HOLD_STEPS == 0):
+           self.commands[k] = MOVES[self.rngs[k].integers(0, len(MOVES))]
+       return self.commands
+   
+   # main objects and moving objects of every world, checked against the shared inflated walls
+   def move_objects(self, commands):
+       new_x = self.main_x + commands[:, 0]
+       new_y = self.main_y + commands[:, 1]
+       moved = ~self.collision_field.blocked_many(new_x, new_y)
+       self.main_x[moved] = new_x[moved]
+       self.main_y[moved] = new_y[moved]
+       
+       # objects whose move collides stay put and pick a new heading from their world's generator
+       new_x = self.object_x + VELOCITY * np.cos(self.object_theta)
+       new_y = self.object_y + VELOCITY * np.sin(self.object_theta)
+       blocked = self.collision_field.blocked_many(new_x.ravel(), new_y.ravel()).reshape(new_x.shape)
+       for k in np.flatnonzero(blocked.any(axis=1)):
+           self.object_theta[k, blocked[k]] = self.rngs[k].uniform(0, 2*np.pi, np.count_nonzero(blocked[k]))
+       self.object_x = np.where(blocked, self.object_x, new_x)
+       self.object_y = np.where(blocked, self.object_y, new_y)
+   
+   # robot moves capped at the robot's velocity, rejected near the map border, near a hit of the world's
+   # last scan (none before the first step), or near a moving object; unlike Environment.is_collision_robot
+   # there is no feature map, so mapped features do not block moves
+   def move_robots(self, actions):
+       length = np.sqrt((actions**2).sum(axis=1))
+       scale = np.minimum(1.0, ROBOT_VELOCITY / np.maximum(length, 1e-12))
+       new_x = self.robot_x + actions[:, 0] * scale
+       new_y = self.robot_y + actions[:, 1] * scale
+       
+       x, y = new_x.astype(np.intp), new_y.astype(np.intp)
+       b = self.collision_buffer
+       blocked = (x < b) | (x >= self.width - b) | (y < b) | (y >= self.height - b)
+       reach = b + MARKER_RADIUS
+       blocked |= ((self.hit_steps > 0) &
+                   (np.abs(self.hit_x.astype(np.intp) - x[:, None]) <= reach) &
+                   (np.abs(self.hit_y.astype(np.intp) - y[:, None]) <= reach)).any(axis=1) & (self.steps > 0)
+       blocked |= (np.sqrt((x[:, None] - self.object_x)**2 + (y[:, None] - self.object_y)**2) < b * 2).any(axis=1)
+       blocked &= length > 0
+       
+       self.robot_x = np.where(blocked, self.robot_x, new_x)
+       self.robot_y = np.where(blocked, self.robot_y, new_y)
+       self.blocked = blocked
+   
+   # scan the given worlds (all by default) in one batched cast and cluster every world's hits into features
+   def scan(self, worlds=slice(None)):
+       robot_x, robot_y = self.robot_x[worlds], self.robot_y[worlds]
+       hit_steps = cast_rays(self.wall_mask, robot_x, robot_y, self.cos, self.sin, self.max_range,
+                             self.object_x[worlds], self.object_y[worlds], self.main_x[worlds], self.main_y[worlds])
+       self.hit_steps[worlds] = hit_steps
+       self.hit_x[worlds] = robot_x[:, None] + self.cos * hit_steps
+       self.hit_y[worlds] = robot_y[:, None] + self.sin * hit_steps
+       self.feature_xy, self.feature_world = extract_features(self.hit_x, self.hit_y, self.hit_steps > 0)
+   
+   # fill the observation and reward rows of the given worlds (all by default) from their last scan
+   # rewards keep the robot at the edge of the main object's zone, with a penalty for blocked moves
+   def observe(self, worlds=None):
+       worlds = np.arange(self.num_worlds) if worlds is None else worlds
+       num_rays = len(self.angles)
+       hit = self.hit_steps[worlds] > 0
+       ranges = np.where(hit, self.hit_steps[worlds], self.max_range).astype(float)
+       # Add noise to simulate sensor error, from each world's own generator
+       for i, k in enumerate(worlds):
+           ranges[i] += hit[i] * self.rngs[k].normal(0, self.noise_std, num_rays)
+       self.observations[worlds, :num_rays] = ranges / self.max_range
+       
+       dx, dy = self.main_x[worlds] - self.robot_x[worlds], self.main_y[worlds] - self.robot_y[worlds]
+       self.observations[worlds, num_rays] = dx / self.max_range
+       self.observations[worlds, num_rays + 1] = dy / self.max_range
+       self.rewards[worlds] = (-np.abs(np.sqrt(dx**2 + dy**2) - OBJ_ZONE) / self.max_range
+                               - COLLISION_PENALTY * self.blocked[worlds])
+   
+   # features found in one world's last scan, as an (n, 2) array
+   def features(self, world):
+       return self.feature_xy[self.feature_world == world]
\ No newline at end of file